@@ -1,22 +1,22 @@
 import cv2
 import time
-import threading
-from queue import Queue, Empty
+from .FrameSource import FrameSource
 
-class Camera:
+
+class Camera(FrameSource):
+    """
+    Captures frames from a V4L2 camera in a background thread.
+
+    Frames are grabbed at the device rate, but only decoded when a consumer
+    asks for one, so stale frames are dropped before paying for MJPEG decoding
+    and a waiting consumer gets a frame as soon as it is decoded.
+    """
     def __init__(self, cfg={}):
+        super().__init__(cfg)
         self.camera_id = cfg.get("camera_id", 0)
-        self.width = cfg.get("width", 640)
-        self.height = cfg.get("height", 480)
         self.fps = cfg.get("fps", 30)
-        self.queue_size = cfg.get("queue_size", 1)
-        
-        self.frame_queue = Queue(maxsize=self.queue_size)
-        self.stop_event = threading.Event()
-        self.capture_thread = None
         self.cap = None
-        self.is_running = False
-        
+
     def _capture_frames(self):
         self.cap = cv2.VideoCapture(self.camera_id, cv2.CAP_V4L2)
         
@@ -29,49 +29,38 @@ class Camera:
         print(f"Camera started - Resolution: {self.width}x{self.height}, FPS: {self.fps}")
         
         while not self.stop_event.is_set():
-            ret, frame = self.cap.read()
-            if ret and frame is not None:
-                if self.frame_queue.full():
-                    try:
-                        self.frame_queue.get_nowait()
-                    except Empty:
-                        pass
-                self.frame_queue.put(frame)
-            else:
+            if not self.cap.grab():
                 time.sleep(0.01)
+                continue
+            timestamp = time.monotonic()
+            self.num_grabbed += 1
+            if not self._wanted:
+                continue  # Nobody asked for it; drop the frame undecoded
+            slot = self._next_slot()
+            ret, frame = self.cap.retrieve(image=self._frames[slot])
+            if ret and frame is not None:
+                self._publish(slot, frame, timestamp, self.num_grabbed)
         
         if self.cap:
             self.cap.release()
             
-    def start(self):
-        self.stop_event.clear()
-        self.capture_thread = threading.Thread(target=self._capture_frames, daemon=True)
-        self.capture_thread.start()
-        self.is_running = True
-        
     def stop(self):
-        self.stop_event.set()
-        if self.capture_thread and self.capture_thread.is_alive():
-            self.capture_thread.join(timeout=1.0)
-        self.is_running = False
+        super().stop()
         print("Camera stopped")
-        
-    def get_frame(self):
-        try:
-            return self.frame_queue.get(timeout=1.0)
-        except Empty:
-            return None
 
 def demo_camera():
-    camera = Camera({"camera_id": 4, "width": 640, "height": 480, "fps": 30, "queue_size": 1})
+    camera = Camera({"camera_id": 4, "width": 640, "height": 480, "fps": 30, "num_buffers": 3})
     camera.start()
     
     try:
         print("Starting camera feed, press 'q' to exit")
         while True:
-            bgr = camera.get_frame()
-            if bgr is not None:
-                cv2.imshow('Camera Feed', bgr)
+            frame = camera.get_latest()
+            if frame is not None:
+                latency_ms = (time.monotonic() - frame.timestamp) * 1000
+                cv2.putText(frame.image, f"#{frame.seq} {latency_ms:.1f} ms", (10, 30),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                cv2.imshow('Camera Feed', frame.image)
             else:
                 print("No frame captured")
                 time.sleep(0.1)
@@ -83,33 +72,5 @@ def demo_camera():
         camera.stop()
         cv2.destroyAllWindows()
 
-# def two_camera():
-#     camera1 = Camera({"camera_id": 0})
-#     camera2 = Camera({"camera_id": 1})
-
-#     try:
-#         camera1.start()
-#         camera2.start()
-
-#         print("Starting dual camera feed, press 'q' to exit")
-
-#         while True:
-#             frame1 = camera1.get_frame()
-#             frame2 = camera2.get_frame()
-
-#             if frame1 is not None:
-#                 cv2.imshow('Camera 1', frame1)
-
-#             if frame2 is not None:
-#                 cv2.imshow('Camera 2', frame2)
-            
-#             if cv2.waitKey(1) & 0xFF == ord('q'):
-#                 break
-
-#     finally:
-#         camera1.stop()
-#         camera2.stop()
-#         cv2.destroyAllWindows()
-
 if __name__ == "__main__":
     demo_camera()
\ No newline at end of file
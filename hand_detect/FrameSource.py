@@ -0,0 +1,149 @@
+import threading
+from typing import NamedTuple, Optional
+import numpy as np
+
+
+class Frame(NamedTuple):
+    """A captured frame with its capture time and sequence number."""
+    # View into the source's frame ring, valid until the next get call.
+    image: np.ndarray
+    # The time.monotonic() time at which the frame was captured.
+    timestamp: float
+    # Increments by one per captured frame; gaps mean frames were skipped.
+    seq: int
+
+
+class FrameSource:
+    """
+    Base of frame sources that capture in a background thread into a frame ring.
+
+    Subclasses implement `_capture_frames`, which runs until `stop_event` is set
+    and publishes frames decoded into `_next_slot()` buffers with `_publish`.
+    Frames are only worth decoding while `_wanted` is set, i.e. a consumer has
+    asked for a frame newer than the last one it got.
+
+    Frames are decoded in place into `num_buffers` (at least 3) reused images:
+    one holds the newest frame, one is held by the consumer and the capture
+    thread writes into another, so no frame is allocated or copied per capture.
+    """
+    def __init__(self, cfg={}):
+        self.width = cfg.get("width", 640)
+        self.height = cfg.get("height", 480)
+        self.num_buffers = max(cfg.get("num_buffers", 3), 3)
+
+        self._frames = [np.zeros((self.height, self.width, 3), dtype=np.uint8)
+                        for _ in range(self.num_buffers)]
+        self._timestamps = [0.0] * self.num_buffers
+        self._seqs = [0] * self.num_buffers
+        # Guards the slot bookkeeping only, never held while capturing.
+        self._cond = threading.Condition()
+        self._latest = -1  # Slot of the newest frame
+        self._held = -1  # Slot handed out to the consumer
+        self._write = -1  # Slot being captured into
+        self.num_grabbed = 0  # Frames grabbed from the device
+        self.seq = 0  # Sequence number of the newest decoded frame
+        self._last_seq = 0  # Sequence number of the last frame handed out
+        self.num_skipped = 0  # Frames grabbed but never handed out
+        self._wanted = True  # A consumer is waiting for the next decoded frame
+
+        self.stop_event = threading.Event()
+        self.capture_thread = None
+        self.is_running = False
+
+    def _capture_frames(self):
+        raise NotImplementedError
+
+    def _next_slot(self) -> int:
+        with self._cond:
+            slot = self._write
+            for _ in range(self.num_buffers):
+                slot = (slot + 1) % self.num_buffers
+                if slot != self._latest and slot != self._held:
+                    break
+            self._write = slot
+            return slot
+
+    def _publish(self, slot: int, frame: np.ndarray, timestamp: float, seq: int):
+        if frame is not self._frames[slot]:
+            # The source delivered another size; keep its buffer for reuse.
+            self._frames[slot] = frame
+        with self._cond:
+            self.seq = seq
+            self._timestamps[slot] = timestamp
+            self._seqs[slot] = seq
+            self._latest = slot
+            self._wanted = False
+            self._cond.notify_all()
+
+    def _wait_wanted(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a consumer to ask for a frame."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._wanted, timeout)
+
+    def start(self):
+        self.stop_event.clear()
+        self.capture_thread = threading.Thread(target=self._capture_frames, daemon=True)
+        self.capture_thread.start()
+        self.is_running = True
+
+    def stop(self):
+        self.stop_event.set()
+        if self.capture_thread and self.capture_thread.is_alive():
+            self.capture_thread.join(timeout=1.0)
+        self.is_running = False
+
+    def request(self):
+        """
+        Ask for the next grabbed frame to be decoded, without waiting for it.
+
+        A decoded frame not taken yet is dropped, so the next `get_latest`
+        returns a frame grabbed after this call.
+        """
+        with self._cond:
+            self._last_seq = self.seq
+            self._wanted = True
+            self._cond.notify_all()
+
+    def get_latest(self, timeout: float = 1.0) -> Optional[Frame]:
+        """
+        Wait up to `timeout` seconds for a frame newer than the last one returned.
+
+        If no decoded frame is pending, the next grabbed frame is decoded; a
+        timeout of 0 polls, leaving that request for the next call. The
+        returned image is only valid until the next call; copy it to keep it.
+        Returns None on timeout.
+        """
+        with self._cond:
+            if self.seq <= self._last_seq:
+                self._wanted = True
+                self._cond.notify_all()
+                if not self._cond.wait_for(lambda: self.seq > self._last_seq, timeout):
+                    return None
+            slot = self._latest
+            self._held = slot
+            seq = self._seqs[slot]
+            self.num_skipped += seq - self._last_seq - 1
+            self._last_seq = seq
+            return Frame(self._frames[slot], self._timestamps[slot], seq)
+
+    def get_frame(self, timeout: float = 1.0):
+        """Return the newest frame's image (see `get_latest`), or None on timeout."""
+        frame = self.get_latest(timeout)
+        return None if frame is None else frame.image
+
+
+def create_frame_source(cfg={}) -> FrameSource:
+    """
+    Create the frame source selected by cfg["source"].
+
+    "camera" (default) captures from a live camera, "replay" plays back a
+    recorded video or image sequence (see `ReplaySource`).
+    """
+    source = cfg.get("source", "camera")
+    if source == "camera":
+        from .Camera import Camera
+        return Camera(cfg)
+    if source == "replay":
+        from .ReplaySource import ReplaySource
+        return ReplaySource(cfg)
+    raise ValueError(f"Unknown frame source: {source}")
@@ -0,0 +1,178 @@
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+import cv2
+import numpy as np
+
+NUM_KEYPOINTS = 21
+
+
+def _inference_worker(conn, frames_name, keypoints_name, frame_size, num_views, hand_type):
+    """Runs MediaPipe on frames in shared memory until None is received.
+
+    Replies True once ready, then whether a hand was found per (view index,
+    frame shape) request.
+    """
+    from .SingleHandDetetor import SingleHandDetector
+
+    frames_shm = SharedMemory(name=frames_name)
+    keypoints_shm = SharedMemory(name=keypoints_name)
+    frames = np.ndarray((num_views, frame_size), dtype=np.uint8, buffer=frames_shm.buf)
+    keypoints = np.ndarray((num_views, 2, NUM_KEYPOINTS, 3), dtype=np.float64,
+                           buffer=keypoints_shm.buf)
+
+    detectors = [SingleHandDetector(hand_type=hand_type, selfie=False) for _ in range(num_views)]
+    rgb = [None] * num_views  # Reused color conversion targets
+    try:
+        conn.send(True)
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            view, shape = request
+            found = False
+            try:
+                bgr = frames[view, :int(np.prod(shape))].reshape(shape)
+                rgb[view] = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=rgb[view])
+                _, joint_pos, keypoint_2d, _ = detectors[view].detect(rgb=rgb[view])
+                if joint_pos is not None:
+                    keypoints[view, 0] = joint_pos
+                    for i, landmark in enumerate(keypoint_2d.landmark):
+                        keypoints[view, 1, i] = (landmark.x, landmark.y, landmark.z)
+                    found = True
+            except Exception as e:
+                print(f"Inference process error: {e}")
+            conn.send(found)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del frames, keypoints
+        frames_shm.close()
+        keypoints_shm.close()
+
+
+class InferenceProcess:
+    """
+    Runs hand detection in a separate process, outside this process's GIL.
+
+    Frames are copied into a shared-memory slot per view and the process is
+    sent just the view index and frame shape. It converts the color, runs
+    MediaPipe with one tracker per view and writes the keypoints into shared
+    memory, replying only whether a hand was found. Per frame, nothing larger
+    than a few bytes is pickled. A process that stops answering is killed and
+    restarted.
+
+    Every slot holds `frame_size` bytes, so views of different resolutions
+    share one process as long as each frame fits.
+    """
+    def __init__(self, frame_size: int, num_views: int = 1, hand_type: str = "Right"):
+        self.frame_size = frame_size
+        self.num_views = num_views
+        self.hand_type = hand_type
+
+        self._frames_shm = None
+        self._keypoints_shm = None
+        self._frames = None
+        self._keypoints = None
+        self._conn = None
+        self.process = None
+        self.start_timeout = 30.0
+        self.num_restarts = 0
+
+    def start(self, timeout: float = 30.0):
+        """Start the process and wait up to `timeout` seconds for MediaPipe to load."""
+        self.start_timeout = timeout
+        self._frames_shm = SharedMemory(create=True, size=self.num_views * self.frame_size)
+        self._keypoints_shm = SharedMemory(create=True, size=self.num_views * 2 * NUM_KEYPOINTS * 3 * 8)
+        self._frames = np.ndarray((self.num_views, self.frame_size), dtype=np.uint8,
+                                  buffer=self._frames_shm.buf)
+        self._keypoints = np.ndarray((self.num_views, 2, NUM_KEYPOINTS, 3), dtype=np.float64,
+                                     buffer=self._keypoints_shm.buf)
+        try:
+            self._start_process()
+        except RuntimeError:
+            self.stop()
+            raise
+
+    def _start_process(self):
+        # Spawn rather than fork: this process runs camera and bus threads.
+        ctx = mp.get_context("spawn")
+        self._conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_inference_worker,
+            args=(child_conn, self._frames_shm.name, self._keypoints_shm.name,
+                  self.frame_size, self.num_views, self.hand_type),
+            daemon=True)
+        self.process.start()
+        child_conn.close()
+        try:
+            ready = self._conn.poll(self.start_timeout) and self._conn.recv()
+        except EOFError:
+            ready = False
+        if not ready:
+            self._stop_process(graceful=False)
+            raise RuntimeError("Inference process failed to start")
+
+    def _stop_process(self, graceful: bool = True):
+        if self.process is None:
+            return
+        if graceful:
+            try:
+                self._conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self._conn.close()
+        self.process = None
+
+    def _restart(self):
+        """Kill the process and start a new one with fresh trackers."""
+        self._stop_process(graceful=False)
+        self.num_restarts += 1
+        self._start_process()
+
+    def stop(self):
+        self._stop_process()
+        if self._frames_shm is not None:
+            self._frames = self._keypoints = None
+            for shm in (self._frames_shm, self._keypoints_shm):
+                shm.close()
+                shm.unlink()
+            self._frames_shm = self._keypoints_shm = None
+
+    def detect(self, view: int, bgr: np.ndarray, timeout: float = 1.0):
+        """
+        Detect the hand in a BGR frame of the given view.
+
+        Returns:
+            (joint_pos, keypoint_2d): The (21, 3) MANO-frame joint positions and
+            the (21, 3) normalized image landmarks, as views into shared memory
+            valid until the next call for this view, or (None, None) if no hand
+            was found.
+
+        Raises:
+            ValueError: If the frame is larger than `frame_size`.
+            TimeoutError: If the process did not answer within `timeout` seconds
+                or died. It has been restarted when this is raised.
+            RuntimeError: If it could not be restarted.
+        """
+        if bgr.nbytes > self.frame_size:
+            raise ValueError(f"Frame of {bgr.nbytes} bytes exceeds the {self.frame_size} byte slot")
+        np.copyto(self._frames[view, :bgr.nbytes].reshape(bgr.shape), bgr)
+        try:
+            self._conn.send((view, bgr.shape))
+            answered = self._conn.poll(timeout)
+            if answered:
+                found = self._conn.recv()
+        except (EOFError, OSError):
+            answered = False
+        if not answered:
+            # The process may still be reading the frame slot, so it is killed
+            # before the slot is reused.
+            self._restart()
+            raise TimeoutError("Inference process did not answer; restarted it")
+        if not found:
+            return None, None
+        return self._keypoints[view, 0], self._keypoints[view, 1]
@@ -0,0 +1,108 @@
+import cv2
+import time
+from typing import List, NamedTuple, Optional
+from .FrameSource import Frame, create_frame_source
+
+
+class FrameSet(NamedTuple):
+    """Frames of all cameras captured within the sync tolerance of each other."""
+    # One frame per camera, in configuration order.
+    frames: List[Frame]
+    # Capture time of the newest frame in the set.
+    timestamp: float
+    # Capture time difference between the newest and the oldest frame.
+    skew: float
+
+
+class MultiCamera:
+    """
+    Captures from several cameras concurrently and pairs their frames by time.
+
+    Every camera is a frame source with its own capture thread, so adding a
+    camera does not slow down the others. `get_synced` asks all cameras for
+    their next frame at once, then replaces any frame older than the newest
+    by more than `tolerance` with that camera's next frame until the set
+    agrees. N free-running cameras at the same rate can always produce a set
+    within (N - 1) / N of a frame period, e.g. half a period for two cameras.
+
+    cfg:
+        cameras: A list of frame source configs (see `create_frame_source`).
+        tolerance: Maximum capture time difference within a set in seconds,
+            by default (N - 1) / N of the first camera's frame period.
+    """
+    def __init__(self, cfg={}):
+        self.sources = [create_frame_source(cam_cfg) for cam_cfg in cfg["cameras"]]
+        if not self.sources:
+            raise ValueError("MultiCamera needs at least one camera")
+        fps = cfg["cameras"][0].get("fps", 30)
+        num_cameras = len(self.sources)
+        self.tolerance = cfg.get("tolerance", (num_cameras - 1) / (num_cameras * fps))
+        self.num_sets = 0  # Synchronized sets delivered
+        self.num_resyncs = 0  # Frames replaced because they were too old for the set
+        self.is_running = False
+
+    def start(self):
+        for source in self.sources:
+            source.start()
+        self.is_running = True
+
+    def stop(self):
+        for source in self.sources:
+            source.stop()
+        self.is_running = False
+
+    def get_synced(self, timeout: float = 1.0) -> Optional[FrameSet]:
+        """
+        Wait up to `timeout` seconds for a set of frames newer than the last set.
+
+        Like `FrameSource.get_latest`, the images are only valid until the next
+        call. Returns None on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        frames = [None] * len(self.sources)
+        pending = list(range(len(self.sources)))
+        while pending:
+            # Request all at once so the cameras decode frames grabbed together.
+            for i in pending:
+                self.sources[i].request()
+            for i in pending:
+                frame = self.sources[i].get_latest(max(deadline - time.monotonic(), 0.0))
+                if frame is None:
+                    return None
+                frames[i] = frame
+            newest = max(frame.timestamp for frame in frames)
+            pending = [i for i, frame in enumerate(frames)
+                       if newest - frame.timestamp > self.tolerance]
+            self.num_resyncs += len(pending)
+
+        newest = max(frame.timestamp for frame in frames)
+        oldest = min(frame.timestamp for frame in frames)
+        self.num_sets += 1
+        return FrameSet(frames, newest, newest - oldest)
+
+
+def demo_multi_camera():
+    cameras = MultiCamera({"cameras": [{"camera_id": 0}, {"camera_id": 2}]})
+    cameras.start()
+
+    try:
+        print("Starting synchronized camera feed, press 'q' to exit")
+        while True:
+            frame_set = cameras.get_synced()
+            if frame_set is None:
+                print("No synchronized frames captured")
+                time.sleep(0.1)
+            else:
+                for i, frame in enumerate(frame_set.frames):
+                    cv2.imshow(f'Camera {i + 1}', frame.image)
+                print(f"Skew: {frame_set.skew * 1000:.1f} ms", end='\r')
+
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+
+    finally:
+        cameras.stop()
+        cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    demo_multi_camera()
@@ -0,0 +1,133 @@
+import cv2
+import glob
+import os
+import time
+from .FrameSource import FrameSource
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class ReplaySource(FrameSource):
+    """
+    Plays back a recorded video or image sequence as a frame source.
+
+    cfg:
+        path: A video file, a directory of images or a glob pattern of images.
+        pacing: "realtime" plays at the recording's frame rate, "fixed" at
+            cfg["fps"], and "max" as fast as the consumer takes frames. The
+            first two skip frames the consumer is too slow for, like a live
+            camera; "max" hands out every frame exactly once.
+        fps: Frame rate for "fixed" pacing, and for "realtime" pacing of image
+            sequences and videos without a frame rate (default 30).
+        loop: Restart from the first frame at the end instead of finishing.
+    """
+    def __init__(self, cfg={}):
+        super().__init__(cfg)
+        self.path = cfg["path"]
+        self.pacing = cfg.get("pacing", "realtime")
+        self.fps = cfg.get("fps", 30)
+        self.loop = cfg.get("loop", False)
+        if self.pacing not in ("realtime", "fixed", "max"):
+            raise ValueError(f"Unknown replay pacing: {self.pacing}")
+
+        if os.path.isdir(self.path):
+            self.image_files = sorted(
+                os.path.join(self.path, name) for name in os.listdir(self.path)
+                if name.lower().endswith(IMAGE_EXTENSIONS))
+        elif glob.has_magic(self.path):
+            self.image_files = sorted(glob.glob(self.path))
+        elif os.path.exists(self.path):
+            self.image_files = None
+        else:
+            raise FileNotFoundError(f"Replay source not found: {self.path}")
+        if self.image_files == []:
+            raise FileNotFoundError(f"No images found for replay: {self.path}")
+
+        self.cap = None
+        self.position = 0  # Index of the next frame in the recording
+        self.finished = False  # Set when the recording ended without looping
+
+    def _open(self) -> float:
+        """Open the recording and return its frame rate, if known."""
+        if self.image_files is not None:
+            return 0.0
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            raise IOError(f"Cannot open video: {self.path}")
+        return self.cap.get(cv2.CAP_PROP_FPS)
+
+    def _grab(self) -> bool:
+        """Advance to the next frame of the recording without decoding it."""
+        if self.image_files is not None:
+            if self.position >= len(self.image_files):
+                return False
+        elif not self.cap.grab():
+            return False
+        self.position += 1
+        return True
+
+    def _retrieve(self, slot: int):
+        """Decode the current frame into the given ring slot."""
+        if self.image_files is not None:
+            frame = cv2.imread(self.image_files[self.position - 1], cv2.IMREAD_COLOR)
+            return frame is not None, frame
+        return self.cap.retrieve(image=self._frames[slot])
+
+    def _rewind(self):
+        self.position = 0
+        if self.cap is not None:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _capture_frames(self):
+        try:
+            recorded_fps = self._open()
+        except IOError as e:
+            print(f"Replay error: {e}")
+            self.finished = True
+            return
+        if self.pacing == "fixed" or recorded_fps <= 0:
+            period = 1.0 / self.fps
+        else:
+            period = 1.0 / recorded_fps
+
+        print(f"Replay started - {self.path}, pacing: {self.pacing}")
+
+        next_time = time.monotonic()
+        while not self.stop_event.is_set():
+            if self.pacing == "max":
+                # Lossless: only move on once the consumer asked for a frame.
+                if not self._wait_wanted(0.1):
+                    continue
+            else:
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                next_time += period
+
+            if not self._grab():
+                if self.loop and self.position > 0:
+                    self._rewind()
+                    continue
+                break
+            timestamp = time.monotonic()
+            self.num_grabbed += 1
+            if not self._wanted:
+                continue  # Nobody asked for it; drop the frame undecoded
+            slot = self._next_slot()
+            ret, frame = self._retrieve(slot)
+            if ret and frame is not None:
+                self._publish(slot, frame, timestamp, self.num_grabbed)
+
+        self.finished = not self.stop_event.is_set()
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+
+    def start(self):
+        self.finished = False
+        self._rewind()
+        super().start()
+
+    def stop(self):
+        super().stop()
+        print("Replay stopped")
@@ -128,6 +128,14 @@ class SingleHandDetector:
         keypoint = keypoint * np.array([img_size[1], img_size[0]])[None, :]
         return keypoint
 
+    @staticmethod
+    def keypoint_2d_from_array(keypoint_array: np.ndarray) -> landmark_pb2.NormalizedLandmarkList:
+        """Rebuild normalized landmarks from a (21, 3) array, e.g. for drawing."""
+        keypoint_2d = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z in keypoint_array:
+            keypoint_2d.landmark.add(x=x, y=y, z=z)
+        return keypoint_2d
+
     @staticmethod
     def estimate_frame_from_hand_points(keypoint_3d_array: np.ndarray) -> np.ndarray:
         """
@@ -1,4 +1,7 @@
 from .Camera import Camera
+from .FrameSource import create_frame_source
+from .MultiCamera import MultiCamera
+from .InferenceProcess import InferenceProcess
 from .SingleHandDetetor import SingleHandDetector
 import cv2
 import numpy as np
@@ -16,9 +19,19 @@ class FingerDetector:
         
         self.cam = None
         self.detector = None
-        self.cam = Camera(cfg["camera"])
+        if "multi_camera" in cfg:
+            # Synchronized views, in order of preference
+            self.cam = MultiCamera(cfg["multi_camera"])
+            self.num_views = len(self.cam.sources)
+        else:
+            self.cam = create_frame_source(cfg["camera"])
+            self.num_views = 1
         # self.cam.start()
-        self.detector = SingleHandDetector(hand_type=self.hand_type, selfie=False)
+        # "process" runs MediaPipe in a separate process fed through shared memory
+        self.inference = cfg.get("inference", "thread")
+        self.inference_process = None
+        if self.inference != "process":
+            self._create_detectors()
         
         self.open_mean_angles = None
         self.closed_mean_angles = None
@@ -26,53 +39,114 @@ class FingerDetector:
         self.is_calibrated = False
         
         self.result_queue = Queue(maxsize=1)
+        self._rgb = [None] * self.num_views  # Reused color conversion targets
         
         self.running = False
         self.detection_thread = None
  
-    def _detection_loop(self):
-        while self.running:
+    def _create_detectors(self):
+        # One detector per view, since each tracks the hand across its own frames
+        self.detectors = [SingleHandDetector(hand_type=self.hand_type, selfie=False)
+                          for _ in range(self.num_views)]
+        self.detector = self.detectors[0]
+
+    def _detect_view(self, view, bgr):
+        """Detect the hand in one camera view; returns (finger_ratios, annotated bgr) or None."""
+        if self.inference == "process":
             try:
-                bgr = self.cam.get_frame()
-                rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-                _, joint_pos, keypoint_2d, _ = self.detector.detect(rgb=rgb)
-                
-                if joint_pos is not None:
-                    bgr = self.detector.draw_skeleton_on_image(bgr, keypoint_2d, style="default")
+                joint_pos, keypoint_array = self._get_inference_process(bgr.nbytes).detect(view, bgr)
+            except RuntimeError as e:
+                print(f"{e}; falling back to in-process detection")
+                if self.inference_process is not None:
+                    self.inference_process.stop()
+                self.inference_process = None
+                self.inference = "thread"
+                self._create_detectors()
+                return self._detect_view(view, bgr)
+            if joint_pos is None:
+                return None
+            keypoint_2d = SingleHandDetector.keypoint_2d_from_array(keypoint_array)
+        else:
+            self._rgb[view] = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=self._rgb[view])
+            _, joint_pos, keypoint_2d, _ = self.detectors[view].detect(rgb=self._rgb[view])
+            if joint_pos is None:
+                return None
+
+        # The camera reuses its frame buffers; the displayed image outlives this frame.
+        bgr = SingleHandDetector.draw_skeleton_on_image(bgr.copy(), keypoint_2d, style="default")
+
+        thumb_vec = joint_pos[4] - joint_pos[0]
+        thumb_vec[0] = thumb_vec[2] = 0
+        thumb_length = np.linalg.norm(thumb_vec)
+        index_vec = joint_pos[8] - joint_pos[0]
+        index_length = np.linalg.norm(index_vec)
+        middle_vec = joint_pos[12] - joint_pos[0]
+        middle_length = np.linalg.norm(middle_vec)
+        ring_vec = joint_pos[16] - joint_pos[0]
+        ring_length = np.linalg.norm(ring_vec)
+        pinky_vec = joint_pos[20] - joint_pos[0]
+        pinky_length = np.linalg.norm(pinky_vec)
 
-                    thumb_vec = joint_pos[4] - joint_pos[0]
-                    thumb_vec[0] = thumb_vec[2] = 0
-                    thumb_length = np.linalg.norm(thumb_vec)
-                    index_vec = joint_pos[8] - joint_pos[0]
-                    index_length = np.linalg.norm(index_vec)
-                    middle_vec = joint_pos[12] - joint_pos[0]
-                    middle_length = np.linalg.norm(middle_vec)
-                    ring_vec = joint_pos[16] - joint_pos[0]
-                    ring_length = np.linalg.norm(ring_vec)
-                    pinky_vec = joint_pos[20] - joint_pos[0]
-                    pinky_length = np.linalg.norm(pinky_vec)
+        thumb_ratio = np.clip((thumb_length - 0.02) / (0.09 - 0.02), 0.0, 1.0)
+        index_ratio = np.clip((index_length - 0.09) / (0.17 - 0.09), 0.0, 1.0)
+        middle_ratio = np.clip((middle_length - 0.09) / (0.18 - 0.09), 0.0, 1.0)
+        ring_ratio = np.clip((ring_length - 0.07) / (0.17 - 0.07), 0.0, 1.0)
+        pinky_ratio = np.clip((pinky_length - 0.08) / (0.14 - 0.08), 0.0, 1.0)
 
-                    thumb_ratio = np.clip((thumb_length - 0.02) / (0.09 - 0.02), 0.0, 1.0)
-                    index_ratio = np.clip((index_length - 0.09) / (0.17 - 0.09), 0.0, 1.0)
-                    middle_ratio = np.clip((middle_length - 0.09) / (0.18 - 0.09), 0.0, 1.0)
-                    ring_ratio = np.clip((ring_length - 0.07) / (0.17 - 0.07), 0.0, 1.0)
-                    pinky_ratio = np.clip((pinky_length - 0.08) / (0.14 - 0.08), 0.0, 1.0)
+        finger_ratios = {
+            'thumb': 1 - thumb_ratio,
+            'index': 1 - index_ratio,
+            'middle': 1 - middle_ratio,
+            'ring': 1 - ring_ratio,
+            'pinky': 1 - pinky_ratio
+        }
+        return finger_ratios, bgr
 
-                    finger_ratios = {
-                        'thumb': 1 - thumb_ratio,
-                        'index': 1 - index_ratio,
-                        'middle': 1 - middle_ratio,
-                        'ring': 1 - ring_ratio,
-                        'pinky': 1 - pinky_ratio
-                    }
+    def _get_inference_process(self, frame_size):
+        """Return the inference process, started once with a slot per view that fits frame_size bytes."""
+        if self.inference_process is not None and self.inference_process.frame_size < frame_size:
+            # A camera delivers larger frames than configured; restart with larger slots.
+            self.inference_process.stop()
+            self.inference_process = None
+        if self.inference_process is None:
+            sources = self.cam.sources if self.num_views > 1 else [self.cam]
+            # Size the slots for the largest configured view, so views of
+            # different resolutions share the process.
+            frame_size = max([frame_size] + [source.width * source.height * 3 for source in sources])
+            self.inference_process = InferenceProcess(frame_size, self.num_views, self.hand_type)
+            self.inference_process.start()
+        return self.inference_process
+
+    def _get_views(self):
+        """Return the images of the next frame (set), or None on timeout."""
+        if self.num_views == 1:
+            bgr = self.cam.get_frame()
+            return None if bgr is None else [bgr]
+        frame_set = self.cam.get_synced()
+        return None if frame_set is None else [frame.image for frame in frame_set.frames]
+
+    def _detection_loop(self):
+        while self.running:
+            try:
+                views = self._get_views()
+                if views is None:
+                    continue
+                # Views are tried in order, so later cameras take over when
+                # the hand is occluded or lost in the earlier ones.
+                result = None
+                for view, bgr in enumerate(views):
+                    result = self._detect_view(view, bgr)
+                    if result is not None:
+                        break
 
+                if result is not None:
                     if not self.result_queue.empty():
                         try:
                             self.result_queue.get_nowait()
                         except:
                             pass
                     
-                    self.result_queue.put((finger_ratios, bgr))
+                    self.result_queue.put(result)
                 
                 time.sleep(0.01)
                 
@@ -89,7 +163,7 @@ class FingerDetector:
             self.cam = Camera()
         self.cam.start()
         
-        if self.detector is None:
+        if self.detector is None and self.inference != "process":
             self.detector = SingleHandDetector(hand_type=self.hand_type, selfie=self.selfie)
         
         self.running = True
@@ -103,6 +177,9 @@ class FingerDetector:
         self.running = False
         if self.detection_thread and self.detection_thread.is_alive():
             self.detection_thread.join(timeout=1.0)
+        if self.inference_process is not None:
+            self.inference_process.stop()
+            self.inference_process = None
         print("Real-time detection stopped!")
     
     def get(self):
@@ -1,4 +1,5 @@
 import os
+import time
 import numpy as np
 
 from leap_hand_utils.leap_node import LeapNode
@@ -25,6 +26,7 @@ class LeapCreateType:
         self.leap_node = None
         self.open_pos = None  # First line (open position)
         self.close_pos = None  # Second line (close position)
+        self.record_path = None  # Trajectory file of the current recording
         self.init_leap()
 
     def init_leap(self):
@@ -36,7 +38,9 @@ class LeapCreateType:
 
     def _get_current_leap_pos(self):
         """Read current 16 joint positions and convert to save format."""
-        current_pos = self.leap_node.read_pos()  # Raw 16-length position
+        # The free drag loop keeps the state snapshot fresh; use it rather than
+        # reading the bus from this thread too.
+        current_pos = self.leap_node.read_state(max_age=np.inf).pos  # Raw 16-length position
         joints = current_pos - 3.14159
         reorder_index = np.array([9, 8, 10, 11, 5, 4, 6, 7, 1, 0, 2, 3, 12, 13, 14, 15])
         inverse_index = np.argsort(reorder_index)
@@ -94,6 +98,26 @@ class LeapCreateType:
 
         print(f"Gesture saved to: {save_path}")
 
+    def start_recording(self):
+        """
+        Start streaming the full free-drag trajectory to a file.
+        
+        Samples are saved to Demonstrations/<HAND_CATEGORY>/<timestamp>.npy
+        """
+        save_dir = os.path.join('Demonstrations', HAND_CATEGORY)
+        os.makedirs(save_dir, exist_ok=True)
+        self.record_path = os.path.join(save_dir, time.strftime('%Y%m%d_%H%M%S') + '.npy')
+        self.leap_node.start_recording(self.record_path)
+        print(f"Recording trajectory to: {self.record_path}")
+
+    def stop_recording(self):
+        """Stop streaming the trajectory and report the number of samples."""
+        if not self.leap_node.is_recording:
+            print("Error: No recording in progress (use 'rec' first)")
+            return
+        num_samples = self.leap_node.stop_recording()
+        print(f"Recorded {num_samples} samples to: {self.record_path}")
+
     def reset_positions(self):
         """Reset all recorded positions."""
         self.open_pos = None
@@ -106,6 +130,8 @@ class LeapCreateType:
         print("  ro     - Record OPEN position (first line)")
         print("  rc     - Record CLOSE position (second line)")
         print("  save   - Save gesture to file")
+        print("  rec    - Start recording the full trajectory")
+        print("  stop   - Stop recording the trajectory")
         print("  reset  - Reset all recordings")
         print("  help   - Display this help message")
         print("  quit   - Exit program")
@@ -133,6 +159,10 @@ class LeapCreateType:
                     self.record_close()
                 elif cmd == 'save':
                     self.save_data()
+                elif cmd == 'rec':
+                    self.start_recording()
+                elif cmd == 'stop':
+                    self.stop_recording()
                 elif cmd == 'reset':
                     self.reset_positions()
                 elif cmd == 'help':
@@ -176,7 +206,10 @@ def main():
             "curr_lim": 120,
             "kP": 150,
             "kI": 0,
-            "kD": 50
+            "kD": 50,
+            "state_max_age": 0.002,  # Reads within 2 ms share one bus transaction
+            "bus_rate": 400,  # Bus thread rate in Hz; recordings sample at this rate
+            "health_interval": 0.5  # Isolate/recover failing motors in the background
         }
     }
     
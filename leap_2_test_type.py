@@ -3,27 +3,13 @@ import sys
 import numpy as np
 
 from leap_hand_utils.leap_node import LeapNode
+from leap_hand_utils.type_table import TypeTable, decode_saved, read_type_file
 
 HAND_CATEGORY = "leap"
 
-# Reorder index consistent with create script
-_REORDER_INDEX = np.array([9, 8, 10, 11, 5, 4, 6, 7, 1, 0, 2, 3, 12, 13, 14, 15])
-_INVERSE_INDEX = np.argsort(_REORDER_INDEX)
-
-
-def _decode_saved(vec: np.ndarray) -> np.ndarray:
+def load_keyframes(type_name: str, category: str = HAND_CATEGORY) -> np.ndarray:
     """
-    Decode saved format (len=16) back to hardware-required absolute position (radians).
-    """
-    joints = np.zeros(16, dtype=float)
-    joints[_INVERSE_INDEX] = vec
-    pos = joints + 3.14159
-    return pos
-
-
-def load_type(type_name: str, category: str = HAND_CATEGORY):
-    """
-    Load gesture type from TypeLibrary return open / close: np.ndarray (16,)
+    Load all keyframes of a gesture type (open -> close) in saved format: np.ndarray (K, 16)
     """
     current_dir = os.path.dirname(os.path.abspath(__file__))
     base_path = os.path.join(current_dir, "TypeLibrary")
@@ -36,23 +22,15 @@ def load_type(type_name: str, category: str = HAND_CATEGORY):
     if not os.path.exists(type_file):
         raise FileNotFoundError(f"Gesture file not found: {type_file}")
     
-    with open(type_file, 'r') as f:
-        open_line = f.readline().strip()
-        close_line = f.readline().strip()
-
-    def parse_line(line: str):
-        """Parse a line of joint values (supports both space-separated and bracketed formats)."""
-        line = line.strip().strip('[]')
-        parts = [p for p in line.replace(',', ' ').split() if p]
-        vals = [float(p) for p in parts]
-        if len(vals) != 16:
-            raise ValueError(f"Invalid line length (expected 16): {line} -> {len(vals)}")
-        return np.array(vals, dtype=float)
+    return read_type_file(type_file)
 
-    open_vec = parse_line(open_line)
-    close_vec = parse_line(close_line)
 
-    return open_vec, close_vec
+def load_type(type_name: str, category: str = HAND_CATEGORY):
+    """
+    Load gesture type from TypeLibrary return open / close: np.ndarray (16,)
+    """
+    keyframes = load_keyframes(type_name, category)
+    return keyframes[0], keyframes[-1]
 
 
 class LeapTypePlayer:
@@ -69,6 +47,7 @@ class LeapTypePlayer:
         self.leap_node = None
         self.open_saved = None
         self.close_saved = None
+        self.type_table = None
         self.fraction = 0.0  # Current position (0.0 = open, 1.0 = close)
         self.step_size = 0.05  # 5% per step
         
@@ -89,10 +68,11 @@ class LeapTypePlayer:
     def _load_type(self):
         try:
             print(f"Loading gesture type: {self.type_name}")
-            o, c = load_type(self.type_name, HAND_CATEGORY)
-            self.open_saved = o
-            self.close_saved = c
-            print("Gesture type loaded successfully")
+            keyframes = load_keyframes(self.type_name, HAND_CATEGORY)
+            self.open_saved = o = keyframes[0]
+            self.close_saved = c = keyframes[-1]
+            self.type_table = TypeTable(decode_saved(keyframes))
+            print(f"Gesture type loaded successfully ({len(keyframes)} keyframes)")
             print(f"  OPEN position:  {o}")
             print(f"  CLOSE position: {c}")
         except Exception as e:
@@ -106,16 +86,15 @@ class LeapTypePlayer:
         Args:
             frac: Interpolation value (0.0 = open, 1.0 = close)
         """
-        if self.leap_node is None or self.open_saved is None or self.close_saved is None:
+        if self.leap_node is None or self.type_table is None:
             return
         
         # Clamp fraction to [0.0, 1.0]
         frac = max(0.0, min(1.0, frac))
         self.fraction = frac
         
-        # Interpolate between open and close
-        interp_saved = self.open_saved * (1 - frac) + self.close_saved * frac
-        target_pos = _decode_saved(interp_saved)
+        # Interpolate through the keyframes from open to close
+        target_pos = self.type_table.evaluate(frac)
         
         # Send to hardware
         self.leap_node.set_leap(target_pos)
@@ -224,7 +203,10 @@ def main():
             "curr_lim": 150,
             "kP": 250,
             "kI": 0,
-            "kD": 100
+            "kD": 100,
+            "state_max_age": 0.002,  # Reads within 2 ms share one bus transaction
+            "suppress_unchanged_goals": True,  # Skip goal writes for unchanged joints
+            "health_interval": 0.5  # Isolate/recover failing motors in the background
         },
         "type": {
             "type_name": name,
@@ -2,6 +2,7 @@ from asr.tencent_asr import AsrServer
 from hand_detect.detectFinger import FingerDetector
 from retrieve.retrieve import Retrieve
 from leap_hand_utils.leap_node import LeapNode
+from leap_hand_utils.type_table import finger_ratios_to_joints, load_type_limits, load_type_table
 
 import os
 import time
@@ -10,10 +11,6 @@ import cv2
 
 from asr.typing_asr import KeyboardAsrServer
 
-# Joint reordering indices for LEAP Hand consistency
-_REORDER_INDEX = np.array([9, 8, 10, 11, 5, 4, 6, 7, 1, 0, 2, 3, 12, 13, 14, 15])
-_INVERSE_INDEX = np.argsort(_REORDER_INDEX)
-
 class RealTimeRunner:
     """
     Main loop integrating ASR, Hand Detection, Retrieval, and LEAP Hand control.
@@ -25,7 +22,10 @@ class RealTimeRunner:
         # Load initial grasp primitive (absolute positions)
         self.category = cfg["type"]["category"]
         self.curr_type = cfg["type"]["type_name"]
-        self.open_pos, self.close_pos = self.load_type(self.curr_type)
+        self.type_table = self.load_type(self.curr_type)
+        # Per-joint closure ratios and the resulting pose, reused every frame
+        self._joint_ratios = np.zeros(16)
+        self._type_pos = np.zeros(16)
 
         # Initialize ASR
         self.asr_type = cfg["asr"].get("type", "typing")
@@ -44,6 +44,8 @@ class RealTimeRunner:
             category=self.category
         )
         self.leap_node = LeapNode(self.cfg["leap_cfg"])
+        self._apply_type_limits()
+        self._bus_health_version = 0
 
     def start(self):
         """Start all components and enter main loop."""
@@ -62,36 +64,43 @@ class RealTimeRunner:
     def change_type(self, new_type: str):
         print(f"[Info] Switching grasp type: {self.curr_type} -> {new_type}")
         self.curr_type = new_type
-        self.open_pos, self.close_pos = self.load_type(self.curr_type)
+        self.type_table = self.load_type(self.curr_type)
+        self._apply_type_limits()
+
+    def _apply_type_limits(self):
+        """Clamp goals to the current type's limits file, if it has one."""
+        limits_file = self._type_path(self.curr_type, ".limits")
+        if os.path.exists(limits_file):
+            self.leap_node.set_joint_limits(*load_type_limits(limits_file))
+        else:
+            self.leap_node.set_joint_limits()
+
+    def _report_bus_health(self):
+        """Print LEAP bus health changes; the monitor itself runs in the background."""
+        monitor = self.leap_node.health_monitor
+        if monitor is None or monitor.version == self._bus_health_version:
+            return
+        self._bus_health_version = monitor.version
+        status = monitor.get_status()
+        if not status["port_ok"]:
+            print("[Error] LEAP Hand not responding, reconnecting in background...")
+        elif status["isolated"]:
+            print(f"[Warn] LEAP motors isolated (not commanded): {status['isolated']}")
+        else:
+            print("[Info] LEAP Hand bus healthy.")
 
-    def load_type(self, type_name: str):
-        """Load and decode grasp primitive (open/close poses) from file."""
-        def parse_line(line: str):
-            line = line.strip().strip('[]')
-            parts = [p for p in line.replace(',', ' ').split() if p]
-            vals = [float(p) for p in parts]
-            if len(vals) != 16:
-                raise ValueError(f"Invalid line length for {type_name}: {len(vals)}")
-            return np.array(vals, dtype=float)
-
-        def _decode_saved(vec: np.ndarray) -> np.ndarray:
-            """Convert saved format to hardware absolute position."""
-            joints = np.zeros(16, dtype=float)
-            joints[_INVERSE_INDEX] = vec
-            return joints + 3.14159
-        
-        # Resolve file path
+    def _type_path(self, type_name: str, extension: str):
         current_dir = os.path.dirname(os.path.abspath(__file__))
-        type_file = os.path.join(current_dir, "TypeLibrary", self.category, f"{type_name}.txt")
+        return os.path.join(current_dir, "TypeLibrary", self.category, f"{type_name}{extension}")
+
+    def load_type(self, type_name: str):
+        """Load a grasp primitive (open -> close keyframes) into a lookup table."""
+        type_file = self._type_path(type_name, ".txt")
         
         if not os.path.exists(type_file):
             raise FileNotFoundError(f"Type file not found: {type_file}")
         
-        with open(type_file, 'r', encoding='utf-8') as f:
-            open_abs = _decode_saved(parse_line(f.readline()))
-            close_abs = _decode_saved(parse_line(f.readline()))
-            
-        return open_abs, close_abs
+        return load_type_table(type_file)
 
     def main_loop(self):
         try:
@@ -117,25 +126,18 @@ class RealTimeRunner:
                     if result and result != self.curr_type:
                         self.change_type(result)
 
-                # 3. Hand Detection -> Robot Control
+                # 3. Bus health -> Status report
+                self._report_bus_health()
+
+                # 4. Hand Detection -> Robot Control
                 result = self.finger_detector.get()
                 if result:
                     ratio, bgr = result
                     
-                    # Define masks for finger groups
-                    thumb_mask = np.array([0]*12 + [1]*4)
-                    index_mask = np.array([1]*4 + [0]*12)
-                    middle_mask = np.array([0]*4 + [1]*4 + [0]*8)
-                    ring_mask = np.array([0]*8 + [1]*4 + [0]*4)
-                    
-                    # Interpolate pose based on finger flexion ratios
+                    # Look up the pose for each finger's flexion ratio
                     # Note: LEAP Hand typically lacks independent pinky control
-                    type_pos = (
-                        (self.open_pos * (1 - ratio['thumb']) + self.close_pos * ratio['thumb']) * thumb_mask +
-                        (self.open_pos * (1 - ratio['index']) + self.close_pos * ratio['index']) * index_mask +
-                        (self.open_pos * (1 - ratio['middle']) + self.close_pos * ratio['middle']) * middle_mask +
-                        (self.open_pos * (1 - ratio['ring']) + self.close_pos * ratio['ring']) * ring_mask
-                    )
+                    finger_ratios_to_joints(ratio, self._joint_ratios)
+                    type_pos = self.type_table.evaluate(self._joint_ratios, out=self._type_pos)
 
                     self.leap_node.set_leap(type_pos)
 
@@ -188,14 +190,16 @@ def run_leap():
         },
         "detector": {
             "camera": {
+                "source": "camera",  # "replay" plays back a recording, see README
                 "camera_id": 4,  # Camera index
                 "width": 640,
                 "height": 480,
                 "fps": 30,
-                "queue_size": 1
+                "num_buffers": 3
             },
             "hand_type": "Left",
             "selfie": False,
+            "inference": "thread",  # "process" runs MediaPipe in a separate process
         },
         "type": {
             "type_name": "box",
@@ -205,7 +209,11 @@ def run_leap():
             "curr_lim": 150,
             "kP": 100,
             "kI": 0,
-            "kD": 150
+            "kD": 150,
+            "state_max_age": 0.002,  # Reads within 2 ms share one bus transaction
+            "suppress_unchanged_goals": True,  # Skip goal writes for unchanged joints
+            "telemetry_capacity": 4096,  # Commanded vs. measured samples kept
+            "health_interval": 0.5  # Isolate/recover failing motors in the background
         },
     }
     runner = RealTimeRunner(cfg)
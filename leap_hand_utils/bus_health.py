@@ -0,0 +1,210 @@
+"""Background health monitoring of a Dynamixel bus.
+
+A single unresponsive motor makes every group read it is part of time out,
+and an unplugged adapter makes all of them fail. `BusHealthMonitor` watches
+the read failure counters of a `DynamixelClient` from its own thread, so the
+control loop never waits on it:
+
+- motors missing from reads, or not answering a ping after a failed read,
+  accumulate failures and are isolated from the state reads and goal writes
+  once they reach `failure_threshold`;
+- isolated motors are pinged every `probe_interval` and brought back (and
+  reconfigured through `on_recover`) once they answer;
+- if no motor answers at all, the port is reopened every
+  `reconnect_interval`, and all motors that answer afterwards are
+  reconfigured through `on_recover` as well.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+from leap_hand_utils.dynamixel_client import ADDR_TORQUE_ENABLE, DynamixelClient
+
+
+class BusHealthMonitor:
+    """Tracks per-motor failures and isolates and recovers motors."""
+
+    def __init__(self,
+                 client: DynamixelClient,
+                 interval: float = 0.5,
+                 failure_threshold: int = 2,
+                 probe_interval: float = 2.0,
+                 reconnect_interval: float = 2.0,
+                 on_recover: Optional[Callable[[Sequence[int]], bool]] = None):
+        """Initializes a new monitor.
+
+        Args:
+            client: The client to monitor.
+            interval: The time between checks in seconds.
+            failure_threshold: The number of consecutive checks a motor must
+                fail before it is isolated.
+            probe_interval: The time between pings of isolated motors.
+            reconnect_interval: The time between attempts to reopen the port.
+            on_recover: Called with the IDs of motors that answer again, to
+                reconfigure them (a power-cycled motor loses its RAM
+                settings). Returns whether that succeeded. By default, only
+                torque is re-enabled.
+        """
+        self.client = client
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.reconnect_interval = reconnect_interval
+        self.on_recover = on_recover
+
+        self.failures = np.zeros(len(client.motor_ids), dtype=np.int64)
+        self.port_ok = True
+        self.num_reconnects = 0
+        # Incremented whenever the isolated set or port status changes.
+        self.version = 0
+
+        self._last_failed_reads, self._last_unavailable = (
+            client.get_read_failures())
+        self._last_probe_time = 0.0
+        self._last_reconnect_time = 0.0
+        self._running = False
+        self._thread = None
+
+    @property
+    def isolated_ids(self) -> list:
+        return [
+            motor_id
+            for motor_id, ok in zip(self.client.motor_ids,
+                                    self.client.active_mask) if not ok
+        ]
+
+    def get_status(self) -> dict:
+        """Returns a snapshot of the bus health."""
+        isolated = self.isolated_ids
+        return {
+            'ok': self.port_ok and not isolated,
+            'port_ok': self.port_ok,
+            'isolated': isolated,
+            'failures': {
+                motor_id: int(count)
+                for motor_id, count in zip(self.client.motor_ids,
+                                           self.failures) if count
+            },
+            'reconnects': self.num_reconnects,
+            'version': self.version,
+        }
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def _loop(self):
+        while self._running:
+            try:
+                self.check()
+            except Exception:
+                logging.exception('Bus health check failed.')
+            time.sleep(self.interval)
+
+    def check(self):
+        """Runs one health check; called periodically by the thread."""
+        client = self.client
+        if not client.is_connected:
+            # Keep retrying a reconnect that failed to reopen the port.
+            if not self.port_ok:
+                self._reconnect()
+            return
+        motor_ids = client.motor_ids
+        active = client.active_mask.copy()
+
+        failed_reads, unavailable = client.get_read_failures()
+        suspect = (unavailable - self._last_unavailable) > 0
+        new_failed_reads = failed_reads - self._last_failed_reads
+        self._last_failed_reads, self._last_unavailable = (failed_reads,
+                                                           unavailable)
+        if new_failed_reads or not self.port_ok:
+            # A failed group read does not say which motor failed; ask each.
+            answered = set(client.ping(
+                [m for m, ok in zip(motor_ids, active) if ok]))
+            if not answered and active.any():
+                self._reconnect()
+                return
+            missing = active & np.array([m not in answered
+                                         for m in motor_ids])
+            if not self.port_ok:
+                # The whole bus was down, e.g. the hand lost power, so every
+                # motor that answers again may have lost its RAM settings.
+                # Reads that failed during the outage are not held against it.
+                self._set_port_ok(True)
+                suspect = missing
+                if answered:
+                    self._recover([m for m in motor_ids if m in answered])
+            else:
+                suspect |= missing
+
+        suspect &= active
+        self.failures[suspect] += 1
+        self.failures[active & ~suspect] = 0
+
+        to_isolate = active & (self.failures >= self.failure_threshold)
+        if to_isolate.any():
+            ids = [m for m, bad in zip(motor_ids, to_isolate) if bad]
+            logging.warning('Isolating unresponsive motors: %s', str(ids))
+            client.set_motors_active(active & ~to_isolate)
+            self.version += 1
+
+        self._probe_isolated()
+
+    def _probe_isolated(self):
+        client = self.client
+        isolated = self.isolated_ids
+        now = time.monotonic()
+        if not isolated or now - self._last_probe_time < self.probe_interval:
+            return
+        self._last_probe_time = now
+        answered = client.ping(isolated)
+        if not answered:
+            return
+        active = client.active_mask.copy()
+        for motor_id in answered:
+            active[client.motor_ids.index(motor_id)] = True
+        client.set_motors_active(active)
+        self._recover(answered)
+
+    def _recover(self, motor_ids: Sequence[int]):
+        """Reconfigures motors that answer again and clears their failures."""
+        client = self.client
+        if self.on_recover is not None:
+            recovered = self.on_recover(motor_ids)
+        else:
+            recovered = not client.write_byte(motor_ids, 1, ADDR_TORQUE_ENABLE)
+        for motor_id in motor_ids:
+            self.failures[client.motor_ids.index(motor_id)] = 0
+        logging.warning('Motors answering again: %s%s', str(motor_ids),
+                        '' if recovered else ' (reconfiguration failed)')
+        self.version += 1
+
+    def _reconnect(self):
+        self._set_port_ok(False)
+        now = time.monotonic()
+        if now - self._last_reconnect_time < self.reconnect_interval:
+            return
+        self._last_reconnect_time = now
+        logging.warning('No motor answers on %s; reopening the port.',
+                        self.client.port_name)
+        if self.client.reconnect():
+            self.num_reconnects += 1
+
+    def _set_port_ok(self, ok: bool):
+        if ok != self.port_ok:
+            self.port_ok = ok
+            self.version += 1
@@ -0,0 +1,271 @@
+"""Finds and applies the fastest working bus settings for the LEAP hand.
+
+Round-trip time at high baud rates is dominated by the motors' Return Delay
+Time (500 us per motor by default) and the USB-serial latency timer (16 ms
+by default on FTDI adapters), not by the bytes on the wire. This tool:
+
+1. checks the FTDI latency timer of the port (and sets it to 1 ms with
+   --fix-latency, which needs write access to sysfs),
+2. scans the baud rates the motors respond at,
+3. optionally moves the motors to --target-baud and sets their Return Delay
+   Time to the minimum with --min-return-delay,
+4. reports the measured read, write and read+write cycle rates.
+
+Example:
+    python -m leap_hand_utils.bus_tuning -d /dev/ttyUSB0 --min-return-delay
+"""
+import argparse
+import logging
+import os
+import time
+from typing import Optional, Sequence
+
+import numpy as np
+
+from leap_hand_utils.dynamixel_client import (
+    ADDR_BAUD_RATE,
+    ADDR_RETURN_DELAY_TIME,
+    ADDR_TORQUE_ENABLE,
+    DynamixelClient,
+)
+from leap_hand_utils.motor_config import MotorConfigProfile, apply_profile
+
+LEAP_MOTOR_IDS = list(range(16))
+
+# Baud Rate register values of the XH series, restricted to the rates the
+# DynamixelSDK PortHandler can open.
+BAUD_RATE_REGISTER = {
+    57600: 1,
+    115200: 2,
+    1000000: 3,
+    2000000: 4,
+    3000000: 5,
+    4000000: 6,
+}
+
+# Path of the FTDI latency timer in milliseconds, by tty name.
+LATENCY_TIMER_PATH = '/sys/bus/usb-serial/devices/{}/latency_timer'
+
+
+def read_latency_timer(port: str) -> Optional[int]:
+    """Returns the USB-serial latency timer of the port in ms, if exposed."""
+    path = LATENCY_TIMER_PATH.format(os.path.basename(port))
+    try:
+        with open(path) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def write_latency_timer(port: str, value: int = 1) -> bool:
+    """Sets the USB-serial latency timer of the port in ms."""
+    path = LATENCY_TIMER_PATH.format(os.path.basename(port))
+    try:
+        with open(path, 'w') as f:
+            f.write(str(value))
+    except OSError as e:
+        logging.error('Could not set the latency timer (%s); try: '
+                      'echo %d | sudo tee %s', e, value, path)
+        return False
+    return True
+
+
+def _make_client(motor_ids: Sequence[int], port: str, baudrate: int,
+                 sim_bus=None) -> DynamixelClient:
+    port_handler = None
+    if sim_bus is not None:
+        from leap_hand_utils.dynamixel_sim import SimulatedPortHandler
+        port_handler = SimulatedPortHandler(sim_bus, port)
+    client = DynamixelClient(motor_ids, port, baudrate,
+                             port_handler=port_handler)
+    client.connect()
+    return client
+
+
+def scan_baud_rates(motor_ids: Sequence[int], port: str,
+                    sim_bus=None) -> dict:
+    """Pings the motors at every supported baud rate.
+
+    Returns:
+        A map from baud rate to the IDs that responded, for the rates at
+        which any motor responded.
+    """
+    found = {}
+    for baudrate in sorted(BAUD_RATE_REGISTER, reverse=True):
+        client = _make_client(motor_ids, port, baudrate, sim_bus)
+        try:
+            responded = client.ping(motor_ids)
+        finally:
+            # Do not touch the torque of motors at other baud rates.
+            client.port_handler.closePort()
+            DynamixelClient.OPEN_CLIENTS.discard(client)
+        if responded:
+            found[baudrate] = responded
+    return found
+
+
+def set_baud_rate(client: DynamixelClient, baudrate: int) -> DynamixelClient:
+    """Moves all motors to a new baud rate and reconnects to them there.
+
+    Returns:
+        A client connected at the new baud rate.
+    """
+    motor_ids = client.motor_ids
+    # The baud rate is in EEPROM, which is only writable with torque off.
+    client.sync_write_bytes(motor_ids, [b'\x00'] * len(motor_ids),
+                            ADDR_TORQUE_ENABLE)
+    client.sync_write_bytes(motor_ids,
+                            [bytes([BAUD_RATE_REGISTER[baudrate]])] *
+                            len(motor_ids), ADDR_BAUD_RATE)
+    time.sleep(0.05)
+    client.port_handler.closePort()
+    DynamixelClient.OPEN_CLIENTS.discard(client)
+
+    sim_bus = getattr(client.port_handler, 'bus', None)
+    new_client = _make_client(motor_ids, client.port_name, baudrate, sim_bus)
+    responded = new_client.ping(motor_ids)
+    if len(responded) != len(motor_ids):
+        logging.error('Motors missing after baud change: %s',
+                      str(sorted(set(motor_ids) - set(responded))))
+    return new_client
+
+
+def set_min_return_delay(client: DynamixelClient) -> bool:
+    """Sets the Return Delay Time of all motors to 0 us.
+
+    This leaves torque disabled, since the register is in EEPROM.
+    """
+    profile = MotorConfigProfile(client.motor_ids, torque_enabled=False)
+    profile.set(ADDR_RETURN_DELAY_TIME, 1, 0)
+    return apply_profile(client, profile)
+
+
+def measure_rates(client: DynamixelClient, duration: float = 1.0) -> dict:
+    """Measures the achievable read, write and read+write cycle rates in Hz."""
+    goal = client.read_state(max_age=0.0).pos.copy()
+
+    def rate(step):
+        step()
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            step()
+            count += 1
+        return count / (time.perf_counter() - start)
+
+    def read():
+        client.read_state(max_age=0.0)
+
+    def write():
+        client.write_desired_pos(client.motor_ids, goal)
+
+    def cycle():
+        read()
+        write()
+
+    return {'read_hz': rate(read), 'write_hz': rate(write),
+            'cycle_hz': rate(cycle)}
+
+
+def tune(motor_ids: Sequence[int],
+         port: str,
+         target_baud: Optional[int] = None,
+         min_return_delay: bool = False,
+         fix_latency: bool = False,
+         duration: float = 1.0,
+         sim_bus=None) -> dict:
+    """Runs the full tuning procedure and prints a report.
+
+    Returns:
+        The final baud rate and the measured rates.
+    """
+    if sim_bus is None:
+        latency = read_latency_timer(port)
+        if latency is None:
+            print('Latency timer: not exposed for {}'.format(port))
+        else:
+            print('Latency timer: {} ms'.format(latency))
+            if latency > 1:
+                if fix_latency and write_latency_timer(port, 1):
+                    print('  -> set to 1 ms')
+                else:
+                    print('  -> adds up to {} ms per read; run with '
+                          '--fix-latency to set it to 1 ms'.format(latency))
+
+    found = scan_baud_rates(motor_ids, port, sim_bus)
+    for baudrate, responded in found.items():
+        print('Baud {:>8}: {} motor(s) respond'.format(baudrate,
+                                                       len(responded)))
+    if not found:
+        raise OSError('No motors responded at any baud rate on {}.'.format(
+            port))
+    # Use the rate at which most motors respond.
+    baudrate = max(found, key=lambda b: len(found[b]))
+
+    client = _make_client(motor_ids, port, baudrate, sim_bus)
+    try:
+        if target_baud is not None and target_baud != baudrate:
+            print('Moving motors from {} to {} baud'.format(
+                baudrate, target_baud))
+            client = set_baud_rate(client, target_baud)
+            baudrate = target_baud
+
+        delays = client.read_block(
+            motor_ids, ADDR_RETURN_DELAY_TIME,
+            np.dtype([('delay', 'u1')]))[0]['delay'].astype(int) * 2
+        print('Return delay: {} us'.format(sorted(set(delays.tolist()))))
+        if min_return_delay and delays.any():
+            if set_min_return_delay(client):
+                print('  -> set to 0 us (torque disabled)')
+
+        rates = measure_rates(client, duration)
+    finally:
+        client.disconnect()
+
+    print('At {} baud: read {:.1f} Hz, write {:.1f} Hz, '
+          'read+write cycle {:.1f} Hz'.format(baudrate, rates['read_hz'],
+                                              rates['write_hz'],
+                                              rates['cycle_hz']))
+    return dict(baudrate=baudrate, **rates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '-m',
+        '--motors',
+        default=','.join(str(m) for m in LEAP_MOTOR_IDS),
+        help='Comma-separated list of motor IDs.')
+    parser.add_argument(
+        '-d',
+        '--device',
+        default='/dev/ttyUSB0',
+        help='The Dynamixel device to connect to.')
+    parser.add_argument(
+        '--target-baud', type=int, choices=sorted(BAUD_RATE_REGISTER),
+        help='Move the motors to this baud rate.')
+    parser.add_argument(
+        '--min-return-delay', action='store_true',
+        help='Set the Return Delay Time of all motors to 0 us.')
+    parser.add_argument(
+        '--fix-latency', action='store_true',
+        help='Set the USB-serial latency timer to 1 ms.')
+    parser.add_argument(
+        '-t', '--duration', type=float, default=1.0,
+        help='Seconds to measure each rate for.')
+    parser.add_argument(
+        '--sim', action='store_true',
+        help='Run against a simulated bus instead of the device.')
+    args = parser.parse_args()
+
+    motors = [int(motor) for motor in args.motors.split(',')]
+    sim_bus = None
+    if args.sim:
+        from leap_hand_utils.dynamixel_sim import SimulatedBus
+        sim_bus = SimulatedBus(motors, baudrate=1000000)
+    tune(motors, args.device, args.target_baud, args.min_return_delay,
+         args.fix_latency, args.duration, sim_bus)
+
+
+if __name__ == '__main__':
+    main()
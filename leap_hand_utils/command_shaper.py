@@ -0,0 +1,169 @@
+"""Velocity, acceleration and jerk limited goal stream for the LEAP hand.
+
+Vision commands arrive at ~30 Hz and type switches jump the target, so
+forwarding them as goal positions makes the motors chase steps at their
+current limit. The shaper runs at bus rate in its own thread and turns the
+latest target into a smooth goal stream.
+
+Per joint, a cascaded position/velocity tracker produces the desired
+acceleration, which is jerk limited before being integrated:
+
+    v_des = clip(pos_gain * (target - pos), +-max_vel)
+    a_des = clip(vel_gain * (v_des - vel), +-max_acc)
+    acc  += clip(a_des - acc, +-max_jerk * dt)
+
+With vel_gain = 4 * pos_gain the response to a step is well damped and does
+not overshoot, but with a jerk limit that is low relative to the gains the
+goal can still overshoot the target. Since targets may sit at the joint
+limits, the published goal is clamped again with the owner's `clip_fn`.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+from leap_hand_utils.dynamixel_client import DoubleBuffer
+
+
+class CommandShaper:
+    """Streams a smoothed goal towards the latest target from a thread."""
+
+    def __init__(self,
+                 write_fn: Callable[[np.ndarray], None],
+                 initial_pos: np.ndarray,
+                 rate: float = 200.0,
+                 max_vel: float = 6.0,
+                 max_acc: float = 60.0,
+                 max_jerk: float = 3000.0,
+                 pos_gain: float = 15.0,
+                 clip_fn: Optional[Callable[[np.ndarray], None]] = None):
+        """Initializes a new shaper.
+
+        Args:
+            write_fn: Called with each goal, e.g. a goal position write. The
+                array is reused, so it must be consumed before returning.
+            initial_pos: The goal the shaper starts from, in radians.
+            rate: The goal stream rate in Hz.
+            max_vel: The maximum joint velocity in rad/s.
+            max_acc: The maximum joint acceleration in rad/s^2.
+            max_jerk: The maximum joint jerk in rad/s^3.
+            pos_gain: The position tracking bandwidth in 1/s; the velocity
+                loop runs 4x faster.
+            clip_fn: If set, called to clamp each goal in place to the joint
+                limits before it is written, e.g. `LeapNode._clamp_goal`.
+        """
+        self.write_fn = write_fn
+        self.rate = rate
+        self.max_vel = max_vel
+        self.max_acc = max_acc
+        self.max_jerk = max_jerk
+        self.pos_gain = pos_gain
+        self.vel_gain = 4.0 * pos_gain
+        self.clip_fn = clip_fn
+
+        num_joints = len(initial_pos)
+        self.pos = np.array(initial_pos, dtype=np.float64)
+        self.vel = np.zeros(num_joints)
+        self.acc = np.zeros(num_joints)
+        self._target = np.array(self.pos)
+        self._target_buffer = DoubleBuffer(num_joints)
+        self._target_buffer.write(self.pos)
+        self._tmp = np.zeros(num_joints)
+        self._goal = np.zeros(num_joints)
+
+        # Cleared while something else, e.g. free drag, owns the goal.
+        self._active = threading.Event()
+        self._active.set()
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    def set_target(self, target: np.ndarray):
+        """Publishes a new target; never blocks on the bus."""
+        self._target_buffer.write(target)
+
+    def reset(self, pos: np.ndarray):
+        """Jumps the shaper to rest at `pos`, e.g. after free drag."""
+        with self._lock:
+            np.copyto(self.pos, pos)
+            self.vel[:] = 0
+            self.acc[:] = 0
+            self._target_buffer.write(pos)
+
+    def pause(self):
+        """Stops writing goals until `resume`."""
+        self._active.clear()
+        # Wait out a step in progress so no goal is written after this.
+        with self._lock:
+            pass
+
+    def resume(self, pos: Optional[np.ndarray] = None):
+        """Resumes writing goals, optionally from rest at `pos`."""
+        if pos is not None:
+            self.reset(pos)
+        self._active.set()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self._active.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def step(self, dt: float) -> np.ndarray:
+        """Advances the goal by `dt` seconds towards the latest target."""
+        self._target_buffer.read(self._target)
+        tmp = self._tmp
+        # Desired velocity.
+        np.subtract(self._target, self.pos, out=tmp)
+        tmp *= self.pos_gain
+        np.clip(tmp, -self.max_vel, self.max_vel, out=tmp)
+        # Desired acceleration.
+        tmp -= self.vel
+        tmp *= self.vel_gain
+        np.clip(tmp, -self.max_acc, self.max_acc, out=tmp)
+        # Jerk-limited acceleration change.
+        tmp -= self.acc
+        max_delta = self.max_jerk * dt
+        np.clip(tmp, -max_delta, max_delta, out=tmp)
+        self.acc += tmp
+        np.multiply(self.acc, dt, out=tmp)
+        self.vel += tmp
+        np.multiply(self.vel, dt, out=tmp)
+        self.pos += tmp
+        return self.pos
+
+    def _loop(self):
+        period = 1.0 / self.rate
+        next_time = time.monotonic()
+        while self._running:
+            self._active.wait()
+            with self._lock:
+                if self._running and self._active.is_set():
+                    try:
+                        goal = self._goal
+                        np.copyto(goal, self.step(period))
+                        if self.clip_fn is not None:
+                            self.clip_fn(goal)
+                        self.write_fn(goal)
+                    except Exception:
+                        logging.exception('Command shaper cycle failed.')
+
+            next_time += period
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Overran the cycle; resynchronize instead of bursting.
+                next_time = time.monotonic()
@@ -0,0 +1,219 @@
+"""Benchmarks for the DynamixelClient bus operations.
+
+Example:
+    python -m leap_hand_utils.dynamixel_benchmark read -d /dev/ttyUSB0 -b 4000000
+    python -m leap_hand_utils.dynamixel_benchmark read --sim
+    python -m leap_hand_utils.dynamixel_benchmark write
+"""
+import argparse
+import time
+from typing import Sequence
+
+import numpy as np
+
+from leap_hand_utils.dynamixel_client import (
+    ADDR_GOAL_POSITION,
+    DEFAULT_POS_SCALE,
+    LEN_GOAL_POSITION,
+    DynamixelClient,
+    READ_BACKEND_BULK,
+    READ_BACKEND_SYNC,
+    signed_to_unsigned,
+)
+
+LEAP_MOTOR_IDS = list(range(16))
+
+
+def benchmark_read(client: DynamixelClient, duration: float = 2.0) -> float:
+    """Reads the pos/vel/cur block back to back and returns the rate in Hz."""
+    # Warm up the port and the parameter packets.
+    for _ in range(10):
+        client.read_state(max_age=0.0)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        client.read_state(max_age=0.0)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def _make_port_handler(motor_ids: Sequence[int], baudrate: int, sim: bool):
+    """Returns a simulated port if `sim` is set, else None for the real one."""
+    if not sim:
+        return None
+    from leap_hand_utils.dynamixel_sim import make_simulated_port
+    return make_simulated_port(motor_ids, baudrate)
+
+
+def compare_read_backends(motor_ids: Sequence[int],
+                          port: str,
+                          baudrate: int,
+                          duration: float = 2.0,
+                          sim: bool = False):
+    """Prints the achievable read rate for the bulk and sync backends."""
+    results = {}
+    for backend in (READ_BACKEND_BULK, READ_BACKEND_SYNC):
+        port_handler = _make_port_handler(motor_ids, baudrate, sim)
+        with DynamixelClient(motor_ids, port, baudrate,
+                             read_backend=backend,
+                             port_handler=port_handler) as client:
+            results[backend] = benchmark_read(client, duration)
+        print('{:>5} read: {:8.1f} Hz'.format(backend, results[backend]))
+    return results
+
+
+def _make_null_port_handler():
+    """Returns a port that discards all writes, so only host CPU is timed."""
+    import dynamixel_sdk
+
+    class NullPortHandler(dynamixel_sdk.PortHandler):
+
+        def setupPort(self, cflag_baud):
+            self.is_open = True
+            self.tx_time_per_byte = (1000.0 / self.baudrate) * 10.0
+            return True
+
+        def closePort(self):
+            self.is_open = False
+
+        def clearPort(self):
+            pass
+
+        def getBytesAvailable(self):
+            return 0
+
+        def readPort(self, length):
+            return b''
+
+        def writePort(self, packet):
+            return len(packet)
+
+    return NullPortHandler('null')
+
+
+def _cpu_time_us(fn, num_calls: int) -> float:
+    """Returns the CPU time per call of `fn` in microseconds."""
+    fn()
+    start = time.process_time()
+    for _ in range(num_calls):
+        fn()
+    return (time.process_time() - start) / num_calls * 1e6
+
+
+def benchmark_write(client: DynamixelClient, num_writes: int = 2000):
+    """Returns the CPU time per goal position write in microseconds.
+
+    Compares the generic `sync_write` path, which converts and re-adds every
+    parameter per call, with the pre-packed `write_desired_pos` path. For
+    each path, the packing of the values and the whole write are timed, as
+    well as the SDK transmit step both paths end in. The client should be
+    on a port that discards writes (see `compare_write_paths`), so serial
+    I/O does not dilute the difference.
+
+    Returns:
+        A dict of path name -> {'pack': us, 'write': us}, plus 'transmit'.
+    """
+    motor_ids = client.motor_ids
+    positions = np.linspace(2.5, 3.5, len(motor_ids))
+    ticks = positions / DEFAULT_POS_SCALE
+    sync_writer = client.dxl.GroupSyncWrite(client.port_handler,
+                                            client.packet_handler,
+                                            ADDR_GOAL_POSITION,
+                                            LEN_GOAL_POSITION)
+    packed_writer = client._get_goal_pos_writer(motor_ids)
+
+    def legacy_pack():
+        # The per-value conversion and parameter handling of `sync_write`.
+        for motor_id, value in zip(motor_ids, ticks):
+            value = signed_to_unsigned(int(value), size=LEN_GOAL_POSITION)
+            sync_writer.addParam(
+                motor_id, value.to_bytes(LEN_GOAL_POSITION, byteorder='little'))
+        sync_writer.makeParam()
+        sync_writer.clearParam()
+
+    def transmit():
+        client.packet_handler.syncWriteTxOnly(client.port_handler,
+                                              ADDR_GOAL_POSITION,
+                                              LEN_GOAL_POSITION,
+                                              packed_writer._param,
+                                              len(packed_writer._param))
+
+    return {
+        'transmit': _cpu_time_us(transmit, num_writes),
+        'sync_write': {
+            'pack': _cpu_time_us(legacy_pack, num_writes),
+            'write': _cpu_time_us(
+                lambda: client.sync_write(motor_ids, ticks, ADDR_GOAL_POSITION,
+                                          LEN_GOAL_POSITION), num_writes),
+        },
+        'write_desired_pos': {
+            'pack': _cpu_time_us(lambda: packed_writer.pack(positions),
+                                 num_writes),
+            'write': _cpu_time_us(
+                lambda: client.write_desired_pos(motor_ids, positions),
+                num_writes),
+        },
+    }
+
+
+def compare_write_paths(motor_ids: Sequence[int], num_writes: int = 2000):
+    """Prints the CPU time per goal position write for both write paths.
+
+    The writes go to a port that discards them, so no device is needed and
+    the times are the host CPU cost alone.
+    """
+    client = DynamixelClient(motor_ids, 'null', 4000000,
+                             port_handler=_make_null_port_handler())
+    client.connect()
+    try:
+        results = benchmark_write(client, num_writes)
+    finally:
+        # Closing the port first skips the torque-off writes of disconnect,
+        # which would wait for replies that never come.
+        client.port_handler.closePort()
+        client.disconnect()
+    for name in ('sync_write', 'write_desired_pos'):
+        print('{:>17}: {:6.1f} us pack, {:6.1f} us CPU per write'.format(
+            name, results[name]['pack'], results[name]['write']))
+    print('{:>17}: {:6.1f} us CPU of the SDK transmit in both'.format(
+        'transmit', results['transmit']))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('benchmark', choices=['read', 'write'])
+    parser.add_argument(
+        '-m',
+        '--motors',
+        default=','.join(str(m) for m in LEAP_MOTOR_IDS),
+        help='Comma-separated list of motor IDs.')
+    parser.add_argument(
+        '-d',
+        '--device',
+        default='/dev/ttyUSB0',
+        help='The Dynamixel device to connect to.')
+    parser.add_argument(
+        '-b', '--baud', type=int, default=4000000,
+        help='The baudrate to connect with.')
+    parser.add_argument(
+        '-t', '--duration', type=float, default=2.0,
+        help='Seconds to run each read benchmark for.')
+    parser.add_argument(
+        '-n', '--num-writes', type=int, default=2000,
+        help='Number of writes per write benchmark.')
+    parser.add_argument(
+        '--sim', action='store_true',
+        help='Run against a simulated bus instead of the device.')
+    args = parser.parse_args()
+
+    motors = [int(motor) for motor in args.motors.split(',')]
+    if args.benchmark == 'read':
+        compare_read_backends(motors, args.device, args.baud, args.duration,
+                              args.sim)
+    elif args.benchmark == 'write':
+        compare_write_paths(motors, args.num_writes)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,20 +2,32 @@
 ##This is based off of the dynamixel SDK
 import atexit
 import logging
+import threading
 import time
-from typing import Optional, Sequence, Union, Tuple
+from typing import NamedTuple, Optional, Sequence, Union, Tuple
 
 import numpy as np
 
 PROTOCOL_VERSION = 2.0
 
 # The following addresses assume XH motor+s.
+ADDR_BAUD_RATE = 8
+ADDR_RETURN_DELAY_TIME = 9
+ADDR_OPERATING_MODE = 11
 ADDR_TORQUE_ENABLE = 64
+ADDR_POSITION_D_GAIN = 80
+ADDR_POSITION_I_GAIN = 82
+ADDR_POSITION_P_GAIN = 84
+ADDR_GOAL_CURRENT = 102
 ADDR_GOAL_POSITION = 116
 ADDR_PRESENT_POSITION = 132
 ADDR_PRESENT_VELOCITY = 128
 ADDR_PRESENT_CURRENT = 126
 ADDR_PRESENT_POS_VEL_CUR = 126
+ADDR_HARDWARE_ERROR_STATUS = 70
+ADDR_PRESENT_TEMPERATURE = 146
+ADDR_INDIRECT_ADDRESS_1 = 168
+ADDR_INDIRECT_DATA_1 = 224
 
 # Data Byte Length
 LEN_PRESENT_POSITION = 4
@@ -23,17 +35,169 @@ LEN_PRESENT_VELOCITY = 4
 LEN_PRESENT_CURRENT = 2
 LEN_PRESENT_POS_VEL_CUR = 10
 LEN_GOAL_POSITION = 4
+LEN_INDIRECT_STATE = 12
 
 DEFAULT_POS_SCALE = 2.0 * np.pi / 4096  # 0.088 degrees
 # See http://emanual.robotis.com/docs/en/dxl/x/xh430-v210/#goal-velocity
 DEFAULT_VEL_SCALE = 0.229 * 2.0 * np.pi / 60.0  # 0.229 rpm
 DEFAULT_CUR_SCALE = 1.34
 
+# Reader backends. Sync Read sends one shared address/length for all motors,
+# Bulk Read sends an address/length pair per motor.
+READ_BACKEND_BULK = 'bulk'
+READ_BACKEND_SYNC = 'sync'
+
+# Layout of the present current/velocity/position block (126..135), used to
+# decode the raw bytes of all motors in one vectorized operation.
+POS_VEL_CUR_DTYPE = np.dtype([('cur', '<i2'), ('vel', '<i4'), ('pos', '<i4')])
+
+# The control table bytes mapped into the indirect data block so that the
+# motor state and health come back in one read, and the resulting layout.
+INDIRECT_STATE_ADDRESSES = (
+    list(range(ADDR_PRESENT_CURRENT, ADDR_PRESENT_CURRENT + 2)) +
+    list(range(ADDR_PRESENT_VELOCITY, ADDR_PRESENT_VELOCITY + 4)) +
+    list(range(ADDR_PRESENT_POSITION, ADDR_PRESENT_POSITION + 4)) +
+    [ADDR_PRESENT_TEMPERATURE, ADDR_HARDWARE_ERROR_STATUS])
+INDIRECT_STATE_DTYPE = np.dtype([('cur', '<i2'), ('vel', '<i4'), ('pos', '<i4'),
+                                 ('temp', 'u1'), ('hw_error', 'u1')])
+
+
+class DynamixelState(NamedTuple):
+    """A snapshot of the motor state taken in a single bus transaction."""
+    pos: np.ndarray
+    vel: np.ndarray
+    cur: np.ndarray
+    # The time.monotonic() time at which the read completed.
+    timestamp: float
+    # Degrees Celsius and Hardware Error Status bits, only available when
+    # the client reads the state through the indirect address block.
+    temperature: Optional[np.ndarray] = None
+    hardware_error: Optional[np.ndarray] = None
+    # Mask of the motors whose values were read in this transaction; the
+    # others (failed or isolated motors) hold their last known values.
+    valid: Optional[np.ndarray] = None
+
+
+class DoubleBuffer:
+    """Lock-free exchange of the latest array value between two threads.
+
+    The producer fills the back buffer and publishes it by flipping the front
+    index, which is a single atomic attribute write. The consumer copies the
+    front buffer out. This assumes one producer and one consumer, with the
+    consumer copying faster than the producer publishes twice.
+    """
+
+    def __init__(self, size: int, dtype=np.float64):
+        self._buffers = np.zeros((2, size), dtype=dtype)
+        self._front = 0
+        # Incremented after every publish so the consumer can detect updates.
+        self.seq = 0
+
+    def write(self, values: np.ndarray):
+        """Publishes the given values."""
+        back = 1 - self._front
+        self._buffers[back] = values
+        self._front = back
+        self.seq += 1
+
+    def read(self, out: np.ndarray) -> np.ndarray:
+        """Copies the latest published values into `out`."""
+        np.copyto(out, self._buffers[self._front])
+        return out
+
+
+class BusStats:
+    """Latency, error and retry statistics of the bus operations.
+
+    The latest `window` durations of each operation are kept in a
+    preallocated ring, from which the percentiles are computed on demand.
+    """
+
+    def __init__(self, window: int = 1024, log_interval: float = 0.0):
+        """Initializes the statistics.
+
+        Args:
+            window: The number of latest samples kept per operation.
+            log_interval: If >0, logs a summary line at most this often in
+                seconds, from whichever thread records an operation.
+        """
+        self.window = window
+        self.log_interval = log_interval
+        self.reset()
+
+    def reset(self):
+        """Clears all statistics."""
+        self._durations = {}
+        self._counts = {}
+        self.errors = {}
+        self.retries = 0
+        self.stale_reads = 0
+        self.unavailable_reads = 0
+        self._last_log_time = time.monotonic()
+
+    def record(self, operation: str, duration: float):
+        """Records the duration in seconds of one operation."""
+        durations = self._durations.get(operation)
+        if durations is None:
+            durations = np.zeros(self.window)
+            self._durations[operation] = durations
+            self._counts[operation] = 0
+        count = self._counts[operation]
+        durations[count % self.window] = duration
+        self._counts[operation] = count + 1
+        if self.log_interval > 0:
+            now = time.monotonic()
+            if now - self._last_log_time >= self.log_interval:
+                self._last_log_time = now
+                logging.info('Dynamixel bus: %s', self.format_summary())
+
+    def record_error(self, context: Optional[str]):
+        """Records a failed packet for the given operation."""
+        context = context or 'unknown'
+        self.errors[context] = self.errors.get(context, 0) + 1
+
+    def summary(self) -> dict:
+        """Returns the statistics, with durations in milliseconds."""
+        operations = {}
+        for operation, durations in list(self._durations.items()):
+            count = self._counts[operation]
+            samples = durations[:min(count, self.window)] * 1e3
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            operations[operation] = {
+                'count': count,
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'p99_ms': float(p99),
+                'max_ms': float(samples.max()),
+            }
+        return {
+            'operations': operations,
+            'errors': dict(self.errors),
+            'retries': self.retries,
+            'stale_reads': self.stale_reads,
+            'unavailable_reads': self.unavailable_reads,
+        }
+
+    def format_summary(self) -> str:
+        """Returns the statistics as a single log line."""
+        summary = self.summary()
+        parts = [
+            '{} n={} p50={:.2f}ms p95={:.2f}ms p99={:.2f}ms'.format(
+                operation, stats['count'], stats['p50_ms'], stats['p95_ms'],
+                stats['p99_ms'])
+            for operation, stats in summary['operations'].items()
+        ]
+        parts.append('errors={} retries={} stale={}'.format(
+            sum(summary['errors'].values()), summary['retries'],
+            summary['stale_reads']))
+        return '; '.join(parts)
+
 
 def dynamixel_cleanup_handler():
     """Cleanup function to ensure Dynamixels are disconnected properly."""
     open_clients = list(DynamixelClient.OPEN_CLIENTS)
     for open_client in open_clients:
+        open_client.stop_bus_thread()
         if open_client.port_handler.is_using:
             logging.warning('Forcing client to close.')
         open_client.port_handler.is_using = False
@@ -73,7 +237,14 @@ class DynamixelClient:
                  lazy_connect: bool = False,
                  pos_scale: Optional[float] = None,
                  vel_scale: Optional[float] = None,
-                 cur_scale: Optional[float] = None):
+                 cur_scale: Optional[float] = None,
+                 state_max_age: float = 0.0,
+                 read_backend: str = READ_BACKEND_BULK,
+                 suppress_unchanged_goals: bool = False,
+                 goal_deadband: int = 0,
+                 port_handler=None,
+                 stats_log_interval: float = 0.0,
+                 use_indirect_state: bool = False):
         """Initializes a new client.
 
         Args:
@@ -91,6 +262,26 @@ class DynamixelClient:
                 motor-dependent. If not provided uses the default scale.
             cur_scale: The scaling factor for the currents. This is
                 motor-dependent. If not provided uses the default scale.
+            state_max_age: The freshness window in seconds within which
+                `read_pos`, `read_vel` and `read_cur` share the last state
+                snapshot instead of issuing a new bus transaction. If 0,
+                every call reads from the bus.
+            read_backend: The group read instruction used by the readers,
+                either 'bulk' (GroupBulkRead) or 'sync' (GroupSyncRead).
+            suppress_unchanged_goals: If True, goal position writes skip
+                motors whose quantized goal did not change by more than
+                `goal_deadband` encoder ticks. See `DynamixelSyncWriter`.
+            goal_deadband: The goal change in encoder ticks that is still
+                considered unchanged.
+            port_handler: A DynamixelSDK-compatible PortHandler to use instead
+                of opening `port`, e.g. a
+                `dynamixel_sim.SimulatedPortHandler`.
+            stats_log_interval: If >0, logs a bus statistics line at most this
+                often in seconds. See `get_stats`.
+            use_indirect_state: If True, maps the present current, velocity,
+                position, temperature and hardware error status into the
+                indirect data block on connect, so `read_state` also returns
+                motor health in the same single read.
         """
         import dynamixel_sdk
         self.dxl = dynamixel_sdk
@@ -99,9 +290,17 @@ class DynamixelClient:
         self.port_name = port
         self.baudrate = baudrate
         self.lazy_connect = lazy_connect
-
-        self.port_handler = self.dxl.PortHandler(port)
+        self.state_max_age = state_max_age
+        self.read_backend = read_backend
+        self.suppress_unchanged_goals = suppress_unchanged_goals
+        self.goal_deadband = goal_deadband
+        self.use_indirect_state = use_indirect_state
+
+        if port_handler is None:
+            port_handler = self.dxl.PortHandler(port)
+        self.port_handler = port_handler
         self.packet_handler = self.dxl.PacketHandler(PROTOCOL_VERSION)
+        self.stats = BusStats(log_interval=stats_log_interval)
 
         self._pos_vel_cur_reader = DynamixelPosVelCurReader(
             self,
@@ -109,29 +308,39 @@ class DynamixelClient:
             pos_scale=pos_scale if pos_scale is not None else DEFAULT_POS_SCALE,
             vel_scale=vel_scale if vel_scale is not None else DEFAULT_VEL_SCALE,
             cur_scale=cur_scale if cur_scale is not None else DEFAULT_CUR_SCALE,
+            backend=read_backend,
         )
-        self._pos_reader = DynamixelPosReader(
-            self,
-            self.motor_ids,
-            pos_scale=pos_scale if pos_scale is not None else DEFAULT_POS_SCALE,
-            vel_scale=vel_scale if vel_scale is not None else DEFAULT_VEL_SCALE,
-            cur_scale=cur_scale if cur_scale is not None else DEFAULT_CUR_SCALE,
-        )
-        self._vel_reader = DynamixelVelReader(
-            self,
-            self.motor_ids,
-            pos_scale=pos_scale if pos_scale is not None else DEFAULT_POS_SCALE,
-            vel_scale=vel_scale if vel_scale is not None else DEFAULT_VEL_SCALE,
-            cur_scale=cur_scale if cur_scale is not None else DEFAULT_CUR_SCALE,
-        )
-        self._cur_reader = DynamixelCurReader(
-            self,
-            self.motor_ids,
-            pos_scale=pos_scale if pos_scale is not None else DEFAULT_POS_SCALE,
-            vel_scale=vel_scale if vel_scale is not None else DEFAULT_VEL_SCALE,
-            cur_scale=cur_scale if cur_scale is not None else DEFAULT_CUR_SCALE,
-        )
+        self._indirect_state_reader = None
+        if use_indirect_state:
+            self._indirect_state_reader = DynamixelIndirectStateReader(
+                self,
+                self.motor_ids,
+                pos_scale=self._pos_vel_cur_reader.pos_scale,
+                vel_scale=self._pos_vel_cur_reader.vel_scale,
+                cur_scale=self._pos_vel_cur_reader.cur_scale,
+                backend=read_backend,
+            )
+        self._state_reader = self._pos_vel_cur_reader
+        # Motors whose indirect data block holds the state mapping.
+        self._indirect_mapped = np.zeros(len(self.motor_ids), dtype=bool)
+        self._block_readers = {}
+        self._state = None
+        # Called with every new state snapshot read from the bus, on the
+        # reading thread. Listeners must be fast and must not raise.
+        self.state_listeners = []
+        # Motors included in the state reads and goal writes; see
+        # `set_motors_active`.
+        self.active_mask = np.ones(len(self.motor_ids), dtype=bool)
         self._sync_writers = {}
+        self._goal_pos_writers = {}
+
+        # Serializes transactions on the port between threads.
+        self.port_lock = threading.RLock()
+        self.bus_rate = None
+        self._bus_thread = None
+        self._bus_running = False
+        self._bus_start_time = None
+        self._goal_buffer = DoubleBuffer(len(self.motor_ids))
 
         self.OPEN_CLIENTS.add(self)
 
@@ -164,8 +373,52 @@ class DynamixelClient:
         # Start with all motors enabled.  NO, I want to set settings before enabled
         #self.set_torque_enabled(self.motor_ids, True)
 
+        if self.use_indirect_state:
+            self.configure_indirect_state()
+
+    def configure_indirect_state(
+            self, motor_ids: Optional[Sequence[int]] = None) -> bool:
+        """Maps the state and health registers into the indirect data block.
+
+        The indirect addresses are volatile, so this runs on every connect and
+        must run again for motors that were power cycled. Until the mapping
+        is verified on all motors, the client reads the plain present
+        current/velocity/position block.
+
+        Args:
+            motor_ids: The motors to map; all motors by default.
+
+        Returns:
+            Whether the mapping was verified on the given motors.
+        """
+        if motor_ids is None:
+            motor_ids = self.motor_ids
+        motor_ids = list(motor_ids)
+        mapping = np.array(INDIRECT_STATE_ADDRESSES, dtype='<u2').tobytes()
+        self.sync_write_bytes(motor_ids, [mapping] * len(motor_ids),
+                              ADDR_INDIRECT_ADDRESS_1)
+        address_dtype = np.dtype([('addresses', '<u2',
+                                   (len(INDIRECT_STATE_ADDRESSES),))])
+        records, valid = self.read_block(motor_ids, ADDR_INDIRECT_ADDRESS_1,
+                                         address_dtype)
+        configured = valid & np.all(
+            records['addresses'] == INDIRECT_STATE_ADDRESSES, axis=1)
+        for motor_id, ok in zip(motor_ids, configured):
+            self._indirect_mapped[self.motor_ids.index(motor_id)] = ok
+        if not self._indirect_mapped.all():
+            logging.warning(
+                'Could not map indirect state for IDs: %s; reading the '
+                'present state block instead.',
+                str([m for m, ok in zip(self.motor_ids, self._indirect_mapped)
+                     if not ok]))
+            self._state_reader = self._pos_vel_cur_reader
+        else:
+            self._state_reader = self._indirect_state_reader
+        return bool(configured.all())
+
     def disconnect(self):
         """Disconnects from the Dynamixel device."""
+        self.stop_bus_thread()
         if not self.is_connected:
             return
         if self.port_handler.is_using:
@@ -177,10 +430,63 @@ class DynamixelClient:
         if self in self.OPEN_CLIENTS:
             self.OPEN_CLIENTS.remove(self)
 
+    def set_motors_active(self, active: np.ndarray):
+        """Includes only the motors in the mask in state reads and goal writes.
+
+        A motor that stops responding makes every group read it is part of
+        time out, so isolating it keeps the rest of the hand readable. The
+        values of inactive motors keep their last read values and are marked
+        invalid in `DynamixelState.valid`.
+
+        Args:
+            active: A boolean mask over `motor_ids`.
+        """
+        np.copyto(self.active_mask, active)
+        readers = [self._pos_vel_cur_reader]
+        if self._indirect_state_reader is not None:
+            readers.append(self._indirect_state_reader)
+        for reader in readers:
+            reader.set_active(self.active_mask)
+        for writer in self._goal_pos_writers.values():
+            writer.set_active(self._active_mask_for(writer.motor_ids))
+
+    def get_read_failures(self) -> Tuple[int, np.ndarray]:
+        """Returns the failure counters of the state reads.
+
+        Returns:
+            The number of reads that failed as a whole, and the number of
+            reads each motor was missing from.
+        """
+        reader = self._state_reader
+        return reader.num_failed_reads, reader.unavailable_per_motor.copy()
+
+    def _active_mask_for(self, motor_ids: Sequence[int]) -> np.ndarray:
+        """Returns the active mask of a subset of the motors."""
+        active = dict(zip(self.motor_ids, self.active_mask))
+        return np.array([active.get(motor_id, True) for motor_id in motor_ids])
+
+    def reconnect(self) -> bool:
+        """Reopens the port after a communication failure.
+
+        Unlike `disconnect`/`connect`, this leaves the motors untouched.
+
+        Returns:
+            Whether the port was reopened at the configured baud rate.
+        """
+        with self.port_lock:
+            if self.port_handler.is_open:
+                self.port_handler.closePort()
+            try:
+                return (self.port_handler.openPort() and
+                        self.port_handler.setBaudRate(self.baudrate))
+            except Exception:
+                logging.exception('Failed to reopen port %s.', self.port_name)
+                return False
+
     def set_torque_enabled(self,
                            motor_ids: Sequence[int],
                            enabled: bool,
-                           retries: int = -1,
+                           retries: int = 3,
                            retry_interval: float = 0.25):
         """Sets whether torque is enabled for the motors.
 
@@ -207,18 +513,158 @@ class DynamixelClient:
             time.sleep(retry_interval)
             retries -= 1
 
+    @property
+    def bus_thread_active(self) -> bool:
+        return self._bus_running
+
+    def start_bus_thread(self, rate: float = 200.0,
+                         start_time: Optional[float] = None):
+        """Starts a thread that owns all goal position and state traffic.
+
+        While it runs, the thread writes the latest goal positions passed to
+        `write_desired_pos` and reads the motor state at a fixed rate. Those
+        calls then only exchange data with the thread and never block on the
+        serial port.
+
+        Args:
+            rate: The bus cycle rate in Hz.
+            start_time: The `time.monotonic()` time cycles are aligned to.
+                Threads of several clients started with the same rate and
+                start time run their cycles in phase.
+        """
+        if self._bus_running:
+            return
+        self.check_connected()
+        self.bus_rate = rate
+        self._bus_start_time = start_time
+        # Publish a first snapshot so readers never see an empty state.
+        self.read_state(max_age=0.0)
+        self._bus_running = True
+        self._bus_thread = threading.Thread(target=self._bus_loop, daemon=True)
+        self._bus_thread.start()
+
+    def stop_bus_thread(self):
+        """Stops the bus thread, if running."""
+        if not self._bus_running:
+            return
+        self._bus_running = False
+        if (self._bus_thread is not None
+                and self._bus_thread is not threading.current_thread()):
+            self._bus_thread.join()
+        self._bus_thread = None
+
+    def _bus_loop(self):
+        """Writes the latest goal and reads the state once per bus cycle."""
+        period = 1.0 / self.bus_rate
+        goal = np.zeros(len(self.motor_ids))
+        goal_writer = self._get_goal_pos_writer(self.motor_ids)
+        last_seq = self._goal_buffer.seq
+        next_time = time.monotonic()
+        if self._bus_start_time is not None:
+            # First cycle on the shared grid of cycle times.
+            cycles = np.ceil((next_time - self._bus_start_time) / period)
+            next_time = self._bus_start_time + max(cycles, 0) * period
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        while self._bus_running:
+            try:
+                seq = self._goal_buffer.seq
+                if seq != last_seq:
+                    last_seq = seq
+                    goal_writer.write(self._goal_buffer.read(goal))
+                self._state = self._read_state_from_bus()
+            except Exception:
+                logging.exception('Bus thread cycle failed.')
+
+            next_time += period
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif self._bus_start_time is not None:
+                # Overran the cycle; skip to the next cycle on the grid.
+                next_time += np.ceil(-delay / period) * period
+                time.sleep(max(next_time - time.monotonic(), 0.0))
+            else:
+                # Overran the cycle; resynchronize instead of bursting.
+                next_time = time.monotonic()
+
+    def read_state(self, max_age: Optional[float] = None) -> DynamixelState:
+        """Returns a snapshot of the current positions, velocities and currents.
+
+        All three quantities come from one read of the contiguous present
+        current/velocity/position block. Snapshots younger than `max_age`
+        seconds are shared between callers instead of hitting the bus again.
+        While the bus thread runs, this returns its latest snapshot.
+
+        Args:
+            max_age: The maximum age in seconds of a cached snapshot that may
+                be returned. If not provided, uses `state_max_age`.
+        """
+        if self._bus_running:
+            return self._state
+        if max_age is None:
+            max_age = self.state_max_age
+        state = self._state
+        if (state is not None and max_age > 0
+                and time.monotonic() - state.timestamp <= max_age):
+            return state
+        state = self._read_state_from_bus()
+        self._state = state
+        return state
+
+    def _read_state_from_bus(self) -> DynamixelState:
+        """Reads a new state snapshot from the motors."""
+        # The reader is swapped when motors are remapped, so fetch it once.
+        reader = self._state_reader
+        if reader is self._indirect_state_reader:
+            pos, vel, cur, temp, hw_error = reader.read()
+            state = DynamixelState(pos, vel, cur, time.monotonic(), temp,
+                                   hw_error, reader.valid.copy())
+        else:
+            pos, vel, cur = reader.read()
+            state = DynamixelState(pos, vel, cur, time.monotonic(),
+                                   valid=reader.valid.copy())
+        for listener in self.state_listeners:
+            listener(state)
+        return state
+
+    def read_block(self, motor_ids: Sequence[int], address: int,
+                   dtype: np.dtype) -> Tuple[np.ndarray, np.ndarray]:
+        """Reads a control table block from a group of motors.
+
+        Args:
+            motor_ids: The motor IDs to read from.
+            address: The control table address to start reading at.
+            dtype: The structured dtype of the block of one motor.
+
+        Returns:
+            The records of all motors and a mask of the motors that answered.
+        """
+        key = (tuple(motor_ids), address, np.dtype(dtype))
+        reader = self._block_readers.get(key)
+        if reader is None:
+            reader = DynamixelBlockReader(self, list(motor_ids), address,
+                                          dtype, backend=self.read_backend)
+            self._block_readers[key] = reader
+        return reader.read()
+
     def read_pos_vel_cur(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-        """Returns the current positions and velocities."""
-        return self._pos_vel_cur_reader.read()
+        """Returns the current positions, velocities and currents."""
+        state = self.read_state()
+        return state.pos.copy(), state.vel.copy(), state.cur.copy()
+
     def read_pos(self) -> np.ndarray:
-        """Returns the current positions and velocities."""
-        return self._pos_reader.read()
+        """Returns the current positions."""
+        return self.read_state().pos.copy()
+
     def read_vel(self) -> np.ndarray:
-        """Returns the current positions and velocities."""
-        return self._vel_reader.read()
+        """Returns the current velocities."""
+        return self.read_state().vel.copy()
+
     def read_cur(self) -> np.ndarray:
-        """Returns the current positions and velocities."""
-        return self._cur_reader.read()
+        """Returns the current currents."""
+        return self.read_state().cur.copy()
 
     def write_desired_pos(self, motor_ids: Sequence[int],
                           positions: np.ndarray):
@@ -230,10 +676,53 @@ class DynamixelClient:
         """
         assert len(motor_ids) == len(positions)
 
-        # Convert to Dynamixel position space.
-        positions = positions / self._pos_vel_cur_reader.pos_scale
-        self.sync_write(motor_ids, positions, ADDR_GOAL_POSITION,
-                        LEN_GOAL_POSITION)
+        if self._bus_running and list(motor_ids) == self.motor_ids:
+            # Hand the goal to the bus thread instead of writing it here.
+            self._goal_buffer.write(positions)
+            return
+        self._get_goal_pos_writer(motor_ids).write(positions)
+
+    def _get_goal_pos_writer(self, motor_ids: Sequence[int]):
+        """Returns the cached goal position writer for the motor IDs."""
+        key = tuple(motor_ids)
+        writer = self._goal_pos_writers.get(key)
+        if writer is None:
+            writer = DynamixelSyncWriter(
+                self,
+                motor_ids,
+                ADDR_GOAL_POSITION,
+                LEN_GOAL_POSITION,
+                scale=self._pos_vel_cur_reader.pos_scale,
+                suppress_unchanged=self.suppress_unchanged_goals,
+                deadband=self.goal_deadband,
+            )
+            if not self.active_mask.all():
+                writer.set_active(self._active_mask_for(motor_ids))
+            self._goal_pos_writers[key] = writer
+        return writer
+
+    def get_goal_write_stats(self) -> dict:
+        """Returns the write/suppression counters of the goal writers."""
+        return {
+            key: writer.get_stats()
+            for key, writer in self._goal_pos_writers.items()
+        }
+
+    def ping(self, motor_ids: Sequence[int]) -> Sequence[int]:
+        """Pings the motors.
+
+        Returns:
+            The IDs of the motors that responded.
+        """
+        self.check_connected()
+        responded = []
+        for motor_id in motor_ids:
+            with self.port_lock:
+                _, comm_result, _ = self.packet_handler.ping(
+                    self.port_handler, motor_id)
+            if comm_result == self.dxl.COMM_SUCCESS:
+                responded.append(motor_id)
+        return responded
 
     def write_byte(
             self,
@@ -254,8 +743,11 @@ class DynamixelClient:
         self.check_connected()
         errored_ids = []
         for motor_id in motor_ids:
-            comm_result, dxl_error = self.packet_handler.write1ByteTxRx(
-                self.port_handler, motor_id, address, value)
+            with self.port_lock:
+                start = time.perf_counter()
+                comm_result, dxl_error = self.packet_handler.write1ByteTxRx(
+                    self.port_handler, motor_id, address, value)
+                self.stats.record('write_byte', time.perf_counter() - start)
             success = self.handle_packet_result(
                 comm_result, dxl_error, motor_id, context='write_byte')
             if not success:
@@ -280,21 +772,47 @@ class DynamixelClient:
                 self.port_handler, self.packet_handler, address, size)
         sync_writer = self._sync_writers[key]
 
-        errored_ids = []
-        for motor_id, desired_pos in zip(motor_ids, values):
-            value = signed_to_unsigned(int(desired_pos), size=size)
-            value = value.to_bytes(size, byteorder='little')
-            success = sync_writer.addParam(motor_id, value)
-            if not success:
-                errored_ids.append(motor_id)
+        # The writer is shared per address, so hold the lock while filling it.
+        with self.port_lock:
+            errored_ids = []
+            for motor_id, desired_pos in zip(motor_ids, values):
+                value = signed_to_unsigned(int(desired_pos), size=size)
+                value = value.to_bytes(size, byteorder='little')
+                success = sync_writer.addParam(motor_id, value)
+                if not success:
+                    errored_ids.append(motor_id)
+
+            if errored_ids:
+                logging.error('Sync write failed for: %s', str(errored_ids))
 
-        if errored_ids:
-            logging.error('Sync write failed for: %s', str(errored_ids))
+            start = time.perf_counter()
+            comm_result = sync_writer.txPacket()
+            self.stats.record('sync_write', time.perf_counter() - start)
+            self.handle_packet_result(comm_result, context='sync_write')
 
-        comm_result = sync_writer.txPacket()
-        self.handle_packet_result(comm_result, context='sync_write')
+            sync_writer.clearParam()
 
-        sync_writer.clearParam()
+    def sync_write_bytes(self, motor_ids: Sequence[int],
+                         data: Sequence[bytes], address: int):
+        """Writes raw bytes of equal length to a group of motors.
+
+        Args:
+            motor_ids: The motor IDs to write to.
+            data: The little-endian bytes to write to each motor.
+            address: The control table address to write to.
+        """
+        self.check_connected()
+        sync_writer = self.dxl.GroupSyncWrite(self.port_handler,
+                                              self.packet_handler, address,
+                                              len(data[0]))
+        for motor_id, motor_data in zip(motor_ids, data):
+            if not sync_writer.addParam(motor_id, list(motor_data)):
+                logging.error('Sync write failed for: %s', str(motor_id))
+        with self.port_lock:
+            start = time.perf_counter()
+            comm_result = sync_writer.txPacket()
+            self.stats.record('sync_write', time.perf_counter() - start)
+        return self.handle_packet_result(comm_result, context='sync_write')
 
     def check_connected(self):
         """Ensures the robot is connected."""
@@ -315,6 +833,7 @@ class DynamixelClient:
         elif dxl_error is not None:
             error_message = self.packet_handler.getRxPacketError(dxl_error)
         if error_message:
+            self.stats.record_error(context)
             if dxl_id is not None:
                 error_message = '[Motor ID: {}] {}'.format(
                     dxl_id, error_message)
@@ -324,6 +843,14 @@ class DynamixelClient:
             return False
         return True
 
+    def get_stats(self) -> dict:
+        """Returns the bus latency, error, retry and stale-read statistics."""
+        return self.stats.summary()
+
+    def reset_stats(self):
+        """Clears the bus statistics."""
+        self.stats.reset()
+
     def convert_to_unsigned(self, value: int, size: int) -> int:
         """Converts the given value to its unsigned representation."""
         if value < 0:
@@ -346,70 +873,350 @@ class DynamixelClient:
         self.disconnect()
 
 
+class DynamixelSyncWriter:
+    """Writes values to a group of motors with a pre-packed Sync Write.
+
+    Unlike `DynamixelClient.sync_write`, the parameter packet (ID followed by
+    the little-endian value for each motor) is allocated once and the values
+    of all motors are packed into it with a single NumPy assignment.
+    """
+
+    def __init__(self,
+                 client: DynamixelClient,
+                 motor_ids: Sequence[int],
+                 address: int,
+                 size: int,
+                 scale: float = 1.0,
+                 suppress_unchanged: bool = False,
+                 deadband: int = 0,
+                 refresh_interval: float = 0.5):
+        """Initializes a new writer.
+
+        Args:
+            client: The client to write through.
+            motor_ids: The motor IDs to write to.
+            address: The control table address to write to.
+            size: The size of the control table value being written to.
+            scale: The values are divided by this before being truncated to
+                integers, e.g. the position scale for goal positions.
+            suppress_unchanged: If True, motors whose integer value moved by
+                no more than `deadband` since it was last sent are left out
+                of the packet, and the packet is skipped if none changed.
+            deadband: The change in integer units (e.g. encoder ticks) that
+                is still considered unchanged.
+            refresh_interval: With `suppress_unchanged`, all values are resent
+                at least this often in seconds, since Sync Write is not
+                acknowledged and a lost packet would otherwise never be
+                repaired.
+        """
+        if size not in (1, 2, 4):
+            raise ValueError('Unsupported write size: {}'.format(size))
+        self.client = client
+        self.motor_ids = list(motor_ids)
+        self.address = address
+        self.size = size
+        self.scale = scale
+
+        record_dtype = np.dtype([('id', 'u1'), ('value', '<u{}'.format(size))])
+        self._param = bytearray(len(self.motor_ids) * record_dtype.itemsize)
+        self._records = np.frombuffer(self._param, dtype=record_dtype)
+        self._records['id'] = self.motor_ids
+        self._scaled = np.zeros(len(self.motor_ids), dtype=np.float64)
+        self._ints = np.zeros(len(self.motor_ids), dtype=np.int64)
+
+        self.suppress_unchanged = suppress_unchanged
+        self.deadband = deadband
+        self.refresh_interval = refresh_interval
+        self._sent_ints = np.zeros(len(self.motor_ids), dtype=np.int64)
+        self._delta = np.zeros(len(self.motor_ids), dtype=np.int64)
+        self._changed = np.zeros(len(self.motor_ids), dtype=bool)
+        self._last_full_write_time = None
+        # Motors left out of the packet, e.g. isolated after failing.
+        self._active = np.ones(len(self.motor_ids), dtype=bool)
+        self._send = np.zeros(len(self.motor_ids), dtype=bool)
+
+        # Counters of transmitted and suppressed packets and values.
+        self.num_writes = 0
+        self.num_partial_writes = 0
+        self.num_suppressed_writes = 0
+        self.suppressed_per_motor = np.zeros(len(self.motor_ids),
+                                             dtype=np.int64)
+
+    def set_active(self, active: np.ndarray):
+        """Limits the packet to the motors in the mask."""
+        active = np.array(active, dtype=bool)
+        # Swap under the lock so a write in progress keeps a consistent mask.
+        with self.client.port_lock:
+            self._active = active
+
+    def pack(self, values: np.ndarray):
+        """Packs the values into the parameter packet."""
+        np.divide(values, self.scale, out=self._scaled)
+        # Truncate like int(), then wrap negative values to two's complement.
+        np.copyto(self._ints, self._scaled, casting='unsafe')
+        self._records['value'] = self._ints
+
+    def write(self, values: np.ndarray) -> bool:
+        """Packs and transmits the values.
+
+        Returns:
+            Whether the packet was transmitted successfully, or True if it
+            was suppressed.
+        """
+        self.client.check_connected()
+        self.pack(values)
+
+        param = self._param
+        # Mask of the motors to send, or None for all of them.
+        send = None
+        now = time.monotonic()
+        full_write_due = (self._last_full_write_time is None or
+                          now - self._last_full_write_time >=
+                          self.refresh_interval)
+        if self.suppress_unchanged and not full_write_due:
+            changed = self._changed
+            np.subtract(self._ints, self._sent_ints, out=self._delta)
+            np.abs(self._delta, out=self._delta)
+            np.greater(self._delta, self.deadband, out=changed)
+            if not changed.any():
+                self.num_suppressed_writes += 1
+                self.suppressed_per_motor += 1
+                return True
+            if not changed.all():
+                # Shrink the packet to the motors that changed.
+                self.num_partial_writes += 1
+                np.logical_not(changed, out=changed)
+                self.suppressed_per_motor += changed
+                np.logical_not(changed, out=changed)
+                send = changed
+                np.copyto(self._sent_ints, self._ints, where=changed)
+            else:
+                np.copyto(self._sent_ints, self._ints)
+        else:
+            np.copyto(self._sent_ints, self._ints)
+            self._last_full_write_time = now
+
+        active = self._active
+        if not active.all():
+            if send is None:
+                send = active
+            else:
+                np.logical_and(send, active, out=self._send)
+                send = self._send
+            if not send.any():
+                return True
+        if send is not None:
+            # Shrink the packet to the selected motors.
+            param = self._records[send].tobytes()
+
+        with self.client.port_lock:
+            start = time.perf_counter()
+            comm_result = self.client.packet_handler.syncWriteTxOnly(
+                self.client.port_handler, self.address, self.size, param,
+                len(param))
+            self.client.stats.record('goal_write', time.perf_counter() - start)
+        self.num_writes += 1
+        return self.client.handle_packet_result(comm_result,
+                                                context='sync_write')
+
+    def get_stats(self) -> dict:
+        """Returns the write and suppression counters."""
+        return {
+            'writes': self.num_writes,
+            'partial_writes': self.num_partial_writes,
+            'suppressed_writes': self.num_suppressed_writes,
+            'suppressed_per_motor': dict(
+                zip(self.motor_ids, self.suppressed_per_motor.tolist())),
+        }
+
+
 class DynamixelReader:
     """Reads data from Dynamixel motors.
 
-    This wraps a GroupBulkRead from the DynamixelSDK.
+    This wraps a GroupBulkRead or GroupSyncRead from the DynamixelSDK.
     """
 
-    def __init__(self, client: DynamixelClient, motor_ids: Sequence[int],
-                 address: int, size: int):
-        """Initializes a new reader."""
+    def __init__(self,
+                 client: DynamixelClient,
+                 motor_ids: Sequence[int],
+                 address: int,
+                 size: int,
+                 backend: str = READ_BACKEND_BULK):
+        """Initializes a new reader.
+
+        Args:
+            client: The client to read through.
+            motor_ids: The motor IDs to read from.
+            address: The control table address to start reading at.
+            size: The number of bytes to read from each motor.
+            backend: Either 'bulk' or 'sync'. If the sync read cannot be set
+                up, falls back to the bulk read.
+        """
         self.client = client
         self.motor_ids = motor_ids
         self.address = address
         self.size = size
         self._initialize_data()
+        # Motors left out of the read, e.g. isolated after failing.
+        self._active = np.ones(len(motor_ids), dtype=bool)
+        self._active_ids = list(motor_ids)
+
+        # Failure counters, for health monitoring.
+        self.num_failed_reads = 0
+        self.unavailable_per_motor = np.zeros(len(motor_ids), dtype=np.int64)
+
+        # The raw bytes of all motors, decoded through a structured view.
+        self._raw = bytearray(len(motor_ids) * size)
+        self._records = np.frombuffer(self._raw, dtype=self._record_dtype())
+        self._valid = np.zeros(len(motor_ids), dtype=bool)
+
+        if backend == READ_BACKEND_SYNC:
+            self.operation = self._make_sync_read(self._active_ids)
+            if self.operation is None:
+                logging.warning(
+                    'Sync read unavailable; falling back to bulk read.')
+                backend = READ_BACKEND_BULK
+        elif backend != READ_BACKEND_BULK:
+            raise ValueError('Unknown read backend: {}'.format(backend))
+        if backend == READ_BACKEND_BULK:
+            self.operation = self._make_bulk_read(self._active_ids)
+        self.backend = backend
 
-        self.operation = self.client.dxl.GroupBulkRead(client.port_handler,
-                                                       client.packet_handler)
-
+    @property
+    def valid(self) -> np.ndarray:
+        """The mask of motors whose data was received by the last read."""
+        return self._valid
+
+    def set_active(self, active: np.ndarray):
+        """Rebuilds the read to include only the motors in the mask."""
+        active = np.array(active, dtype=bool)
+        active_ids = [
+            motor_id for motor_id, ok in zip(self.motor_ids, active) if ok
+        ]
+        if self.backend == READ_BACKEND_SYNC:
+            operation = self._make_sync_read(active_ids)
+        else:
+            operation = self._make_bulk_read(active_ids)
+        # The mask, IDs and operation must change together, since a read in
+        # progress looks the active IDs up in its operation's data.
+        with self.client.port_lock:
+            self._active = active
+            self._active_ids = active_ids
+            self.operation = operation
+
+    def _make_bulk_read(self, motor_ids: Sequence[int]):
+        """Creates a GroupBulkRead for the given motors."""
+        operation = self.client.dxl.GroupBulkRead(self.client.port_handler,
+                                                  self.client.packet_handler)
         for motor_id in motor_ids:
-            success = self.operation.addParam(motor_id, address, size)
+            success = operation.addParam(motor_id, self.address, self.size)
             if not success:
                 raise OSError(
                     '[Motor ID: {}] Could not add parameter to bulk read.'
                     .format(motor_id))
+        return operation
+
+    def _make_sync_read(self, motor_ids: Sequence[int]):
+        """Creates a GroupSyncRead for the given motors, or None if unsupported."""
+        operation = self.client.dxl.GroupSyncRead(self.client.port_handler,
+                                                  self.client.packet_handler,
+                                                  self.address, self.size)
+        for motor_id in motor_ids:
+            if not operation.addParam(motor_id):
+                return None
+        return operation
 
     def read(self, retries: int = 1):
         """Reads data from the motors."""
         self.client.check_connected()
         success = False
-        while not success and retries >= 0:
-            comm_result = self.operation.txRxPacket()
-            success = self.client.handle_packet_result(
-                comm_result, context='read')
-            retries -= 1
-
-        # If we failed, send a copy of the previous data.
-        if not success:
+        stats = self.client.stats
+        if not self._active_ids:
+            self._valid[:] = False
             return self._get_data()
+        with self.client.port_lock:
+            attempt = 0
+            while not success and retries >= 0:
+                if attempt > 0:
+                    stats.retries += 1
+                start = time.perf_counter()
+                comm_result = self.operation.txRxPacket()
+                stats.record('read', time.perf_counter() - start)
+                success = self.client.handle_packet_result(
+                    comm_result, context='read')
+                retries -= 1
+                attempt += 1
+
+            # If we failed, send a copy of the previous data.
+            if not success:
+                stats.stale_reads += 1
+                self.num_failed_reads += 1
+                self._valid[:] = False
+                return self._get_data()
+
+            valid = self._load_raw()
+            active = self._active
+        if not valid.all():
+            # Isolated motors are left out of the read on purpose.
+            missing = active & ~valid
+            if missing.any():
+                stats.unavailable_reads += 1
+                self.unavailable_per_motor += missing
+                errored_ids = [
+                    motor_id for motor_id, ok in zip(self.motor_ids, missing)
+                    if ok
+                ]
+                logging.error('%s read data is unavailable for: %s',
+                              self.backend.capitalize(), str(errored_ids))
+        self._update_data(valid)
 
-        errored_ids = []
-        for i, motor_id in enumerate(self.motor_ids):
-            # Check if the data is available.
-            available = self.operation.isAvailable(motor_id, self.address,
-                                                   self.size)
-            if not available:
-                errored_ids.append(motor_id)
-                continue
+        return self._get_data()
 
-            self._update_data(i, motor_id)
+    def _raw_chunks(self) -> list:
+        """Returns the received data of each motor, in motor ID order."""
+        data_dict = self.operation.data_dict
+        if self.backend == READ_BACKEND_BULK:
+            return [data_dict[motor_id][0] for motor_id in self._active_ids]
+        return [data_dict[motor_id] for motor_id in self._active_ids]
 
-        if errored_ids:
-            logging.error('Bulk read data is unavailable for: %s',
-                          str(errored_ids))
+    def _load_raw(self) -> np.ndarray:
+        """Copies the received bytes of all motors into the raw buffer.
 
-        return self._get_data()
+        Returns:
+            A boolean mask of the motors whose data was received in full.
+        """
+        valid = self._valid
+        chunks = self._raw_chunks()
+        joined = b''.join(map(bytes, chunks))
+        if self.operation.last_result and len(joined) == len(self._raw):
+            self._raw[:] = joined
+            valid[:] = True
+            return valid
+
+        # Slow path: only copy the active motors that returned a full packet.
+        size = self.size
+        valid[:] = False
+        active_indices = np.flatnonzero(self._active)
+        for i, chunk in zip(active_indices, chunks):
+            valid[i] = self.operation.last_result and len(chunk) == size
+            if valid[i]:
+                self._raw[i * size:(i + 1) * size] = bytes(chunk)
+        return valid
+
+    def _record_dtype(self) -> np.dtype:
+        """Returns the dtype of the data read from a single motor."""
+        if self.size not in (1, 2, 4):
+            raise ValueError('Unsupported read size: {}'.format(self.size))
+        return np.dtype([('value', '<u{}'.format(self.size))])
 
     def _initialize_data(self):
         """Initializes the cached data."""
         self._data = np.zeros(len(self.motor_ids), dtype=np.float32)
 
-    def _update_data(self, index: int, motor_id: int):
-        """Updates the data index for the given motor ID."""
-        self._data[index] = self.operation.getData(motor_id, self.address,
-                                                   self.size)
+    def _update_data(self, valid: np.ndarray):
+        """Updates the data of the motors in the `valid` mask."""
+        np.copyto(self._data, self._records['value'], where=valid,
+                  casting='unsafe')
 
     def _get_data(self):
         """Returns a copy of the data."""
@@ -424,12 +1231,14 @@ class DynamixelPosVelCurReader(DynamixelReader):
                  motor_ids: Sequence[int],
                  pos_scale: float = 1.0,
                  vel_scale: float = 1.0,
-                 cur_scale: float = 1.0):
+                 cur_scale: float = 1.0,
+                 backend: str = READ_BACKEND_BULK):
         super().__init__(
             client,
             motor_ids,
             address=ADDR_PRESENT_POS_VEL_CUR,
             size=LEN_PRESENT_POS_VEL_CUR,
+            backend=backend,
         )
         self.pos_scale = pos_scale
         self.vel_scale = vel_scale
@@ -441,20 +1250,19 @@ class DynamixelPosVelCurReader(DynamixelReader):
         self._vel_data = np.zeros(len(self.motor_ids), dtype=np.float32)
         self._cur_data = np.zeros(len(self.motor_ids), dtype=np.float32)
 
-    def _update_data(self, index: int, motor_id: int):
-        """Updates the data index for the given motor ID."""
-        cur = self.operation.getData(motor_id, ADDR_PRESENT_CURRENT,
-                                     LEN_PRESENT_CURRENT)
-        vel = self.operation.getData(motor_id, ADDR_PRESENT_VELOCITY,
-                                     LEN_PRESENT_VELOCITY)
-        pos = self.operation.getData(motor_id, ADDR_PRESENT_POSITION,
-                                     LEN_PRESENT_POSITION)
-        cur = unsigned_to_signed(cur, size=2)
-        vel = unsigned_to_signed(vel, size=4)
-        pos = unsigned_to_signed(pos, size=4)
-        self._pos_data[index] = float(pos) * self.pos_scale
-        self._vel_data[index] = float(vel) * self.vel_scale
-        self._cur_data[index] = float(cur) * self.cur_scale
+    def _record_dtype(self) -> np.dtype:
+        """Returns the dtype of the data read from a single motor."""
+        return POS_VEL_CUR_DTYPE
+
+    def _update_data(self, valid: np.ndarray):
+        """Updates the data of the motors in the `valid` mask."""
+        records = self._records
+        np.multiply(records['pos'], self.pos_scale, out=self._pos_data,
+                    where=valid)
+        np.multiply(records['vel'], self.vel_scale, out=self._vel_data,
+                    where=valid)
+        np.multiply(records['cur'], self.cur_scale, out=self._cur_data,
+                    where=valid)
 
     def _get_data(self):
         """Returns a copy of the data."""
@@ -462,52 +1270,26 @@ class DynamixelPosVelCurReader(DynamixelReader):
                 self._cur_data.copy())
 
 
-class DynamixelPosReader(DynamixelReader):
-    """Reads positions and velocities."""
-
-    def __init__(self,
-                 client: DynamixelClient,
-                 motor_ids: Sequence[int],
-                 pos_scale: float = 1.0,
-                 vel_scale: float = 1.0,
-                 cur_scale: float = 1.0):
-        super().__init__(
-            client,
-            motor_ids,
-            address=ADDR_PRESENT_POS_VEL_CUR,
-            size=LEN_PRESENT_POS_VEL_CUR,
-        )
-        self.pos_scale = pos_scale
-
-    def _initialize_data(self):
-        """Initializes the cached data."""
-        self._pos_data = np.zeros(len(self.motor_ids), dtype=np.float32)
-
-    def _update_data(self, index: int, motor_id: int):
-        """Updates the data index for the given motor ID."""
-        pos = self.operation.getData(motor_id, ADDR_PRESENT_POSITION,
-                                     LEN_PRESENT_POSITION)
-        pos = unsigned_to_signed(pos, size=4)
-        self._pos_data[index] = float(pos) * self.pos_scale
-
-    def _get_data(self):
-        """Returns a copy of the data."""
-        return self._pos_data.copy()
+class DynamixelIndirectStateReader(DynamixelPosVelCurReader):
+    """Reads the state and health mapped into the indirect data block.
 
-class DynamixelVelReader(DynamixelReader):
-    """Reads positions and velocities."""
+    See `DynamixelClient.configure_indirect_state` for the mapping.
+    """
 
     def __init__(self,
                  client: DynamixelClient,
                  motor_ids: Sequence[int],
                  pos_scale: float = 1.0,
                  vel_scale: float = 1.0,
-                 cur_scale: float = 1.0):
-        super().__init__(
+                 cur_scale: float = 1.0,
+                 backend: str = READ_BACKEND_BULK):
+        DynamixelReader.__init__(
+            self,
             client,
             motor_ids,
-            address=ADDR_PRESENT_POS_VEL_CUR,
-            size=LEN_PRESENT_POS_VEL_CUR,
+            address=ADDR_INDIRECT_DATA_1,
+            size=LEN_INDIRECT_STATE,
+            backend=backend,
         )
         self.pos_scale = pos_scale
         self.vel_scale = vel_scale
@@ -515,50 +1297,66 @@ class DynamixelVelReader(DynamixelReader):
 
     def _initialize_data(self):
         """Initializes the cached data."""
-        self._vel_data = np.zeros(len(self.motor_ids), dtype=np.float32)
+        super()._initialize_data()
+        self._temp_data = np.zeros(len(self.motor_ids), dtype=np.uint8)
+        self._hw_error_data = np.zeros(len(self.motor_ids), dtype=np.uint8)
 
-    def _update_data(self, index: int, motor_id: int):
-        """Updates the data index for the given motor ID."""
-        vel = self.operation.getData(motor_id, ADDR_PRESENT_VELOCITY,
-                                     LEN_PRESENT_VELOCITY)
-        vel = unsigned_to_signed(vel, size=4)
-        self._vel_data[index] = float(vel) * self.vel_scale
+    def _record_dtype(self) -> np.dtype:
+        """Returns the dtype of the data read from a single motor."""
+        return INDIRECT_STATE_DTYPE
+
+    def _update_data(self, valid: np.ndarray):
+        """Updates the data of the motors in the `valid` mask."""
+        super()._update_data(valid)
+        np.copyto(self._temp_data, self._records['temp'], where=valid)
+        np.copyto(self._hw_error_data, self._records['hw_error'], where=valid)
 
     def _get_data(self):
         """Returns a copy of the data."""
-        return self._vel_data.copy()
+        return super()._get_data() + (self._temp_data.copy(),
+                                      self._hw_error_data.copy())
 
-class DynamixelCurReader(DynamixelReader):
-    """Reads positions and velocities."""
+
+class DynamixelBlockReader(DynamixelReader):
+    """Reads an arbitrary control table block described by a dtype."""
 
     def __init__(self,
                  client: DynamixelClient,
                  motor_ids: Sequence[int],
-                 pos_scale: float = 1.0,
-                 vel_scale: float = 1.0,
-                 cur_scale: float = 1.0):
+                 address: int,
+                 dtype: np.dtype,
+                 backend: str = READ_BACKEND_BULK):
+        self.dtype = np.dtype(dtype)
         super().__init__(
             client,
             motor_ids,
-            address=ADDR_PRESENT_POS_VEL_CUR,
-            size=LEN_PRESENT_POS_VEL_CUR,
+            address=address,
+            size=self.dtype.itemsize,
+            backend=backend,
         )
-        self.cur_scale = cur_scale
+
+    def read(self, retries: int = 1):
+        """Reads the block.
+
+        Returns:
+            The records of all motors and a mask of the motors that answered
+            in this read.
+        """
+        self._valid[:] = False
+        data = super().read(retries)
+        return data, self._valid.copy()
+
+    def _record_dtype(self) -> np.dtype:
+        """Returns the dtype of the data read from a single motor."""
+        return self.dtype
 
     def _initialize_data(self):
         """Initializes the cached data."""
-        self._cur_data = np.zeros(len(self.motor_ids), dtype=np.float32)
+        self._data = np.zeros(len(self.motor_ids), dtype=self.dtype)
 
-    def _update_data(self, index: int, motor_id: int):
-        """Updates the data index for the given motor ID."""
-        cur = self.operation.getData(motor_id, ADDR_PRESENT_CURRENT,
-                                     LEN_PRESENT_CURRENT)
-        cur = unsigned_to_signed(cur, size=2)
-        self._cur_data[index] = float(cur) * self.cur_scale
-
-    def _get_data(self):
-        """Returns a copy of the data."""
-        return self._cur_data.copy()
+    def _update_data(self, valid: np.ndarray):
+        """Updates the data of the motors in the `valid` mask."""
+        self._data[valid] = self._records[valid]
 
 
 # Register global cleanup function.
@@ -0,0 +1,543 @@
+"""A simulated Dynamixel Protocol 2 bus for running without hardware.
+
+The simulation sits below the DynamixelSDK: `SimulatedPortHandler` replaces
+the serial PortHandler, so the SDK packet handler and group read/write
+classes (and therefore `DynamixelClient` and `LeapNode`) run unchanged.
+Each `SimulatedXHMotor` keeps an XH430 control table and tracks its goal
+position with a current-limited PD model.
+
+Example:
+    bus = SimulatedBus(range(16), baudrate=4000000)
+    client = DynamixelClient(range(16), 'sim', 4000000,
+                             port_handler=SimulatedPortHandler(bus))
+"""
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from leap_hand_utils.dynamixel_client import DEFAULT_VEL_SCALE
+
+# Control table addresses of the XH430 series.
+ADDR_MODEL_NUMBER = 0
+ADDR_FIRMWARE_VERSION = 6
+ADDR_ID = 7
+ADDR_BAUD_RATE = 8
+ADDR_RETURN_DELAY_TIME = 9
+ADDR_OPERATING_MODE = 11
+ADDR_CURRENT_LIMIT = 38
+ADDR_MAX_POSITION_LIMIT = 48
+ADDR_MIN_POSITION_LIMIT = 52
+ADDR_TORQUE_ENABLE = 64
+ADDR_STATUS_RETURN_LEVEL = 68
+ADDR_HARDWARE_ERROR_STATUS = 70
+ADDR_POSITION_D_GAIN = 80
+ADDR_POSITION_I_GAIN = 82
+ADDR_POSITION_P_GAIN = 84
+ADDR_GOAL_CURRENT = 102
+ADDR_GOAL_POSITION = 116
+ADDR_MOVING = 122
+ADDR_PRESENT_CURRENT = 126
+ADDR_PRESENT_VELOCITY = 128
+ADDR_PRESENT_POSITION = 132
+ADDR_PRESENT_INPUT_VOLTAGE = 144
+ADDR_PRESENT_TEMPERATURE = 146
+# Two blocks of 28 indirect addresses (2 bytes each) and their data bytes.
+INDIRECT_BLOCKS = ((168, 224), (578, 634))
+NUM_INDIRECT_PER_BLOCK = 28
+# Addresses below this are EEPROM and can only be written with torque off.
+EEPROM_END = 64
+CONTROL_TABLE_SIZE = 662
+
+XH430_V210_MODEL_NUMBER = 1050
+OPERATING_MODE_POSITION = 3
+OPERATING_MODE_CURRENT_POSITION = 5
+
+# Baud rate register values.
+BAUD_RATES = {
+    0: 9600,
+    1: 57600,
+    2: 115200,
+    3: 1000000,
+    4: 2000000,
+    5: 3000000,
+    6: 4000000,
+    7: 4500000,
+}
+
+# Instructions and status errors of Protocol 2.
+INST_PING = 0x01
+INST_READ = 0x02
+INST_WRITE = 0x03
+INST_REBOOT = 0x08
+INST_STATUS = 0x55
+INST_SYNC_READ = 0x82
+INST_SYNC_WRITE = 0x83
+INST_BULK_READ = 0x92
+INST_BULK_WRITE = 0x93
+BROADCAST_ID = 0xFE
+ERROR_INSTRUCTION = 0x02
+ERROR_CRC = 0x03
+ERROR_DATA_RANGE = 0x04
+ERROR_ACCESS = 0x07
+ERROR_ALERT = 0x80
+
+# PD model constants. With the LEAP gains (kP=250, kD=100) the joints settle
+# in about 0.1 s, close to the real hand.
+_GAIN_P = 0.8  # Current units per (P gain / 128) per tick of error.
+_GAIN_D = 0.012  # Current units per (D gain / 16) per tick/s.
+_ACCEL_PER_CURRENT = 1000.0  # ticks/s^2 per current unit.
+_FRICTION = 5.0  # 1/s
+_MAX_SUBSTEP = 0.0005
+# Longer idle gaps between bus accesses are truncated to bound the
+# integration cost; the joints settle well within this.
+_MAX_ADVANCE = 1.0
+_TICKS_TO_RAD = 2.0 * np.pi / 4096
+
+
+def _make_crc_table() -> List[int]:
+    """Builds the lookup table of the Protocol 2 CRC-16 (polynomial 0x8005)."""
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x8005) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return table
+
+
+_CRC_TABLE = _make_crc_table()
+
+
+def _crc16(data: Sequence[int]) -> int:
+    """Computes the Protocol 2 CRC-16 of the data."""
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) ^ _CRC_TABLE[((crc >> 8) ^ byte) & 0xFF]) & 0xFFFF
+    return crc
+
+
+def _stuff(body: bytes) -> bytes:
+    """Inserts a 0xFD after every FF FF FD in the packet body."""
+    return body.replace(b'\xff\xff\xfd', b'\xff\xff\xfd\xfd')
+
+
+def _unstuff(body: bytes) -> bytes:
+    """Removes the byte stuffing from a packet body."""
+    return body.replace(b'\xff\xff\xfd\xfd', b'\xff\xff\xfd')
+
+
+def make_status_packet(motor_id: int, error: int, params: bytes = b'') -> bytes:
+    """Builds a Protocol 2 status packet."""
+    body = _stuff(bytes([INST_STATUS, error]) + bytes(params))
+    length = len(body) + 2
+    packet = bytes([0xFF, 0xFF, 0xFD, 0x00, motor_id, length & 0xFF,
+                    length >> 8]) + body
+    crc = _crc16(packet)
+    return packet + bytes([crc & 0xFF, crc >> 8])
+
+
+class SimulatedXHMotor:
+    """A simulated XH430 motor with a control table and PD tracking."""
+
+    def __init__(self,
+                 motor_id: int,
+                 baudrate: int = 4000000,
+                 position: int = 2048):
+        """Initializes a new motor.
+
+        Args:
+            motor_id: The ID of the motor.
+            baudrate: The baud rate the motor listens at.
+            position: The initial position in ticks.
+        """
+        self.table = bytearray(CONTROL_TABLE_SIZE)
+        baud_index = {v: k for k, v in BAUD_RATES.items()}[baudrate]
+        self._set(ADDR_MODEL_NUMBER, 2, XH430_V210_MODEL_NUMBER)
+        self._set(ADDR_FIRMWARE_VERSION, 1, 46)
+        self._set(ADDR_ID, 1, motor_id)
+        self._set(ADDR_BAUD_RATE, 1, baud_index)
+        self._set(ADDR_RETURN_DELAY_TIME, 1, 250)
+        self._set(ADDR_OPERATING_MODE, 1, OPERATING_MODE_POSITION)
+        self._set(ADDR_CURRENT_LIMIT, 2, 648)
+        self._set(ADDR_MAX_POSITION_LIMIT, 4, 4095)
+        self._set(ADDR_MIN_POSITION_LIMIT, 4, 0)
+        self._set(ADDR_STATUS_RETURN_LEVEL, 1, 2)
+        self._set(ADDR_POSITION_P_GAIN, 2, 800)
+        self._set(ADDR_GOAL_CURRENT, 2, 648)
+        self._set(ADDR_GOAL_POSITION, 4, position)
+        self._set(ADDR_PRESENT_INPUT_VOLTAGE, 2, 120)
+        self._set(ADDR_PRESENT_TEMPERATURE, 1, 35)
+
+        self._pos = float(position)
+        self._vel = 0.0
+        self._cur = 0.0
+        self._last_time = None
+        # Current units applied by the environment, e.g. a hand dragging the
+        # joint in free-drag mode.
+        self.external_current = 0.0
+        # If set, the motor ignores all packets, e.g. to inject a bus fault.
+        self.offline = False
+        self._set_present_state()
+        # The RAM area as it comes up after power on.
+        self._ram_defaults = bytes(self.table[EEPROM_END:])
+
+    @property
+    def motor_id(self) -> int:
+        return self.table[ADDR_ID]
+
+    @property
+    def baudrate(self) -> int:
+        return BAUD_RATES.get(self.table[ADDR_BAUD_RATE], 0)
+
+    @property
+    def return_delay(self) -> float:
+        """The return delay time in seconds."""
+        return self.table[ADDR_RETURN_DELAY_TIME] * 2e-6
+
+    @property
+    def torque_enabled(self) -> bool:
+        return bool(self.table[ADDR_TORQUE_ENABLE])
+
+    def _get(self, address: int, size: int, signed: bool = False) -> int:
+        return int.from_bytes(self.table[address:address + size], 'little',
+                              signed=signed)
+
+    def _set(self, address: int, size: int, value: int):
+        value &= (1 << (8 * size)) - 1
+        self.table[address:address + size] = value.to_bytes(size, 'little')
+
+    def _set_present_state(self):
+        """Writes the model state into the present-value registers."""
+        vel = self._vel * _TICKS_TO_RAD / DEFAULT_VEL_SCALE
+        self._set(ADDR_PRESENT_CURRENT, 2, int(round(self._cur)))
+        self._set(ADDR_PRESENT_VELOCITY, 4, int(round(vel)))
+        self._set(ADDR_PRESENT_POSITION, 4, int(round(self._pos)))
+        self._set(ADDR_MOVING, 1, int(abs(vel) > 0))
+
+    def advance(self, now: float):
+        """Integrates the motor model up to `now` (a monotonic time)."""
+        if self._last_time is None:
+            self._last_time = now
+            return
+        elapsed = min(now - self._last_time, _MAX_ADVANCE)
+        self._last_time = now
+        if elapsed <= 0:
+            return
+
+        torque = self.torque_enabled
+        goal = self._get(ADDR_GOAL_POSITION, 4, signed=True)
+        kp = self._get(ADDR_POSITION_P_GAIN, 2) / 128.0 * _GAIN_P
+        kd = self._get(ADDR_POSITION_D_GAIN, 2) / 16.0 * _GAIN_D
+        if self.table[ADDR_OPERATING_MODE] == OPERATING_MODE_CURRENT_POSITION:
+            limit = min(self._get(ADDR_GOAL_CURRENT, 2),
+                        self._get(ADDR_CURRENT_LIMIT, 2))
+        else:
+            limit = self._get(ADDR_CURRENT_LIMIT, 2)
+
+        steps = int(math.ceil(elapsed / _MAX_SUBSTEP))
+        dt = elapsed / steps
+        pos, vel = self._pos, self._vel
+        cur = 0.0
+        for _ in range(steps):
+            if torque:
+                cur = kp * (goal - pos) - kd * vel
+                cur = min(max(cur, -limit), limit)
+            else:
+                cur = 0.0
+            accel = ((cur + self.external_current) * _ACCEL_PER_CURRENT -
+                     _FRICTION * vel)
+            vel += accel * dt
+            pos += vel * dt
+        self._pos, self._vel, self._cur = pos, vel, cur
+        self._set_present_state()
+
+    def _resolve(self, address: int) -> int:
+        """Maps an indirect data address to the address it points to."""
+        for address_start, data_start in INDIRECT_BLOCKS:
+            index = address - data_start
+            if 0 <= index < NUM_INDIRECT_PER_BLOCK:
+                return self._get(address_start + 2 * index, 2)
+        return address
+
+    def _is_indirect(self, address: int, length: int) -> bool:
+        return any(address < data_start + NUM_INDIRECT_PER_BLOCK and
+                   data_start < address + length
+                   for _, data_start in INDIRECT_BLOCKS)
+
+    def read(self, address: int, length: int) -> Tuple[int, bytes]:
+        """Reads from the control table.
+
+        Returns:
+            The status error and the data.
+        """
+        if address < 0 or address + length > CONTROL_TABLE_SIZE:
+            return ERROR_ACCESS, b''
+        if self._is_indirect(address, length):
+            data = bytes(self.table[self._resolve(a) % CONTROL_TABLE_SIZE]
+                         for a in range(address, address + length))
+        else:
+            data = bytes(self.table[address:address + length])
+        return self._status_error(), data
+
+    def write(self, address: int, data: bytes) -> int:
+        """Writes to the control table.
+
+        Returns:
+            The status error.
+        """
+        if address < 0 or address + len(data) > CONTROL_TABLE_SIZE:
+            return ERROR_ACCESS
+        if self._is_indirect(address, len(data)):
+            for offset, value in enumerate(data):
+                error = self.write(self._resolve(address + offset),
+                                   bytes([value]))
+                if error & ~ERROR_ALERT:
+                    return error
+            return self._status_error()
+        if address < EEPROM_END and self.torque_enabled:
+            return ERROR_ACCESS
+        self.table[address:address + len(data)] = data
+        if address <= ADDR_TORQUE_ENABLE < address + len(data):
+            # Enabling torque holds the present position.
+            if self.torque_enabled and ADDR_GOAL_POSITION not in range(
+                    address, address + len(data)):
+                self._set(ADDR_GOAL_POSITION, 4, int(round(self._pos)))
+        return self._status_error()
+
+    def reboot(self, power_cycle: bool = False):
+        """Reboots the motor, clearing torque and hardware errors.
+
+        Args:
+            power_cycle: If True, models the motor losing power instead: the
+                whole RAM area (torque, gains, goals and the indirect
+                addresses) returns to its power-on values. The joint stays
+                where it is.
+        """
+        if power_cycle:
+            self.table[EEPROM_END:] = self._ram_defaults
+            self._set(ADDR_GOAL_POSITION, 4, int(round(self._pos)))
+            self._vel = self._cur = 0.0
+            self._set_present_state()
+        self.table[ADDR_TORQUE_ENABLE] = 0
+        self.table[ADDR_HARDWARE_ERROR_STATUS] = 0
+
+    def _status_error(self) -> int:
+        return ERROR_ALERT if self.table[ADDR_HARDWARE_ERROR_STATUS] else 0
+
+
+class SimulatedBus:
+    """A set of simulated motors on one half-duplex bus."""
+
+    def __init__(self,
+                 motor_ids: Sequence[int],
+                 baudrate: int = 4000000,
+                 positions: Optional[Sequence[int]] = None):
+        """Initializes a new bus.
+
+        Args:
+            motor_ids: The IDs of the motors on the bus.
+            baudrate: The baud rate all motors start at.
+            positions: The initial positions in ticks, 2048 by default.
+        """
+        if positions is None:
+            positions = [2048] * len(motor_ids)
+        self.motors = {
+            motor_id: SimulatedXHMotor(motor_id, baudrate, position)
+            for motor_id, position in zip(motor_ids, positions)
+        }
+        self._lock = threading.Lock()
+
+    def process(self, packet: bytes,
+                baudrate: int) -> List[Tuple[float, bytes]]:
+        """Processes an instruction packet.
+
+        Args:
+            packet: The instruction packet as sent on the wire.
+            baudrate: The baud rate the packet was sent at. Motors listening
+                at a different rate ignore it.
+
+        Returns:
+            The status packets in the order they are sent, each with the
+            return delay of the responding motor in seconds.
+        """
+        if len(packet) < 10 or packet[:4] != b'\xff\xff\xfd\x00':
+            return []
+        length = packet[5] | (packet[6] << 8)
+        if len(packet) < 7 + length:
+            return []
+        packet = packet[:7 + length]
+        crc = packet[-2] | (packet[-1] << 8)
+        if _crc16(packet[:-2]) != crc:
+            return []
+        target_id = packet[4]
+        instruction = packet[7]
+        params = _unstuff(packet[8:-2])
+
+        with self._lock:
+            now = time.monotonic()
+            for motor in self.motors.values():
+                motor.advance(now)
+            listening = {
+                motor_id: motor
+                for motor_id, motor in self.motors.items()
+                if motor.baudrate == baudrate and not motor.offline
+            }
+            return self._dispatch(target_id, instruction, params, listening)
+
+    def _dispatch(self, target_id: int, instruction: int, params: bytes,
+                  motors: Dict[int, SimulatedXHMotor]):
+        responses = []
+
+        def respond(motor, error, data=b''):
+            responses.append((motor.return_delay,
+                              make_status_packet(motor.motor_id, error, data)))
+
+        if instruction in (INST_PING, INST_READ, INST_WRITE, INST_REBOOT):
+            if target_id == BROADCAST_ID:
+                targets = list(motors.values())
+            elif target_id in motors:
+                targets = [motors[target_id]]
+            else:
+                targets = []
+            for motor in targets:
+                if instruction == INST_PING:
+                    error, data = motor.read(ADDR_MODEL_NUMBER, 2)
+                    data += bytes([motor.table[ADDR_FIRMWARE_VERSION]])
+                    respond(motor, error, data)
+                elif instruction == INST_READ:
+                    address = params[0] | (params[1] << 8)
+                    size = params[2] | (params[3] << 8)
+                    respond(motor, *motor.read(address, size))
+                elif instruction == INST_WRITE:
+                    address = params[0] | (params[1] << 8)
+                    error = motor.write(address, params[2:])
+                    if (target_id != BROADCAST_ID and
+                            motor.table[ADDR_STATUS_RETURN_LEVEL] >= 2):
+                        respond(motor, error)
+                else:
+                    motor.reboot()
+                    if target_id != BROADCAST_ID:
+                        respond(motor, 0)
+        elif instruction == INST_SYNC_READ:
+            address = params[0] | (params[1] << 8)
+            size = params[2] | (params[3] << 8)
+            for motor_id in params[4:]:
+                if motor_id in motors:
+                    respond(motors[motor_id],
+                            *motors[motor_id].read(address, size))
+        elif instruction == INST_SYNC_WRITE:
+            address = params[0] | (params[1] << 8)
+            size = params[2] | (params[3] << 8)
+            for i in range(4, len(params) - size, size + 1):
+                motor = motors.get(params[i])
+                if motor is not None:
+                    motor.write(address, params[i + 1:i + 1 + size])
+        elif instruction == INST_BULK_READ:
+            for i in range(0, len(params) - 4, 5):
+                motor = motors.get(params[i])
+                if motor is not None:
+                    address = params[i + 1] | (params[i + 2] << 8)
+                    size = params[i + 3] | (params[i + 4] << 8)
+                    respond(motor, *motor.read(address, size))
+        elif instruction == INST_BULK_WRITE:
+            i = 0
+            while i + 5 <= len(params):
+                address = params[i + 1] | (params[i + 2] << 8)
+                size = params[i + 3] | (params[i + 4] << 8)
+                motor = motors.get(params[i])
+                if motor is not None:
+                    motor.write(address, params[i + 5:i + 5 + size])
+                i += 5 + size
+        elif target_id in motors:
+            respond(motors[target_id], ERROR_INSTRUCTION)
+        return responses
+
+
+def _load_port_handler_base():
+    import dynamixel_sdk
+    return dynamixel_sdk.PortHandler
+
+
+class SimulatedPortHandler(_load_port_handler_base()):
+    """A DynamixelSDK PortHandler connected to a `SimulatedBus`.
+
+    Responses become readable after the time they would take on a real bus:
+    the instruction and status bytes at 10 bits per byte, each motor's
+    return delay, and the USB-serial latency.
+    """
+
+    def __init__(self,
+                 bus: SimulatedBus,
+                 port_name: str = 'sim',
+                 latency: float = 0.001,
+                 realtime: bool = True):
+        """Initializes a new port.
+
+        Args:
+            bus: The simulated bus to talk to.
+            port_name: The name reported for the port.
+            latency: The USB-serial latency in seconds added to every
+                response, e.g. the FTDI latency timer.
+            realtime: If False, responses are readable immediately, which is
+                useful to profile the CPU cost of the host side alone.
+        """
+        super().__init__(port_name)
+        self.bus = bus
+        self.latency = latency
+        self.realtime = realtime
+        self._rx = bytearray()
+        # Pending (ready time, bytes) chunks not yet readable.
+        self._pending = []
+
+    def setupPort(self, cflag_baud):
+        self.is_open = True
+        self._rx.clear()
+        self._pending = []
+        self.tx_time_per_byte = (1000.0 / self.baudrate) * 10.0
+        return True
+
+    def closePort(self):
+        self.is_open = False
+
+    def clearPort(self):
+        pass
+
+    def getBytesAvailable(self):
+        self._collect()
+        return len(self._rx)
+
+    def readPort(self, length):
+        self._collect()
+        data = bytes(self._rx[:length])
+        del self._rx[:length]
+        return data
+
+    def writePort(self, packet):
+        packet = bytes(packet)
+        byte_time = 10.0 / self.baudrate
+        ready = time.monotonic() + len(packet) * byte_time + self.latency
+        for return_delay, response in self.bus.process(packet, self.baudrate):
+            ready += return_delay + len(response) * byte_time
+            self._pending.append((ready, response))
+        return len(packet)
+
+    def _collect(self):
+        """Moves the responses that have arrived into the receive buffer."""
+        if not self._pending:
+            return
+        now = time.monotonic()
+        while self._pending and (not self.realtime
+                                 or self._pending[0][0] <= now):
+            self._rx += self._pending.pop(0)[1]
+
+
+def make_simulated_port(motor_ids: Sequence[int],
+                        baudrate: int = 4000000,
+                        positions: Optional[Sequence[int]] = None,
+                        **port_kwargs) -> SimulatedPortHandler:
+    """Creates a simulated bus with the given motors and returns its port."""
+    return SimulatedPortHandler(
+        SimulatedBus(motor_ids, baudrate, positions), **port_kwargs)
@@ -14,19 +14,33 @@ one_range: [-1, 1] for all joints to facilitate RL
 allegro:  Allegro hand in real or sim
 '''
 
+# Joint limits, computed once. The arrays are read-only so they can be shared.
+_LEAPSIM_MIN = np.array([-1.047, -0.314, -0.506, -0.366, -1.047, -0.314, -0.506, -0.366, -1.047, -0.314, -0.506, -0.366, -0.349, -0.47, -1.20, -1.34])
+_LEAPSIM_MAX = np.array([1.047,    2.23,  1.885,  2.042,  1.047,   2.23,  1.885,  2.042,  1.047,   2.23,  1.885,  2.042,  2.094,  2.443, 1.90,  1.88])
+_LEAPHAND_MIN = _LEAPSIM_MIN + 3.14159
+_LEAPHAND_MAX = _LEAPSIM_MAX + 3.14159
+# sim_ones_to_LEAPhand is joints * _ONES_SCALE + _ONES_OFFSET
+_ONES_SCALE = 0.5 * (_LEAPSIM_MAX - _LEAPSIM_MIN)
+_ONES_OFFSET = _ONES_SCALE + _LEAPSIM_MIN + 3.14159
+for _limits in (_LEAPSIM_MIN, _LEAPSIM_MAX, _LEAPHAND_MIN, _LEAPHAND_MAX, _ONES_SCALE, _ONES_OFFSET):
+    _limits.setflags(write=False)
+
+'''
+All conversions accept a single pose (16,) or a batch (N, 16), and an optional
+out= array to write into (which may be the input itself) instead of allocating.
+'''
+
 #Safety clips all joints so nothing unsafe can happen. Highly recommend using this before commanding
-def angle_safety_clip(joints):
-    sim_min, sim_max = LEAPsim_limits()
-    real_min = LEAPsim_to_LEAPhand(sim_min)
-    real_max = LEAPsim_to_LEAPhand(sim_max)
-    return np.clip(joints, real_min, real_max)
+def angle_safety_clip(joints, out = None):
+    return np.clip(joints, _LEAPHAND_MIN, _LEAPHAND_MAX, out = out)
 
 ###Sometimes it's useful to constrain the thumb more heavily(you have to implement here), but regular usually works good.
 def LEAPsim_limits(type = "regular"):
-    if type == "regular":
-        sim_min = np.array([-1.047, -0.314, -0.506, -0.366, -1.047, -0.314, -0.506, -0.366, -1.047, -0.314, -0.506, -0.366, -0.349, -0.47, -1.20, -1.34])
-        sim_max = np.array([1.047,    2.23,  1.885,  2.042,  1.047,   2.23,  1.885,  2.042,  1.047,   2.23,  1.885,  2.042,  2.094,  2.443, 1.90,  1.88])
-    return sim_min, sim_max
+    #"regular" is the only set so far; other types (e.g. hack_thumb = False) fall back to it.
+    return _LEAPSIM_MIN, _LEAPSIM_MAX
+#Limits in real LEAP hand positions
+def LEAPhand_limits(type = "regular"):
+    return _LEAPHAND_MIN, _LEAPHAND_MAX
 
 #this goes from [-1, 1] to [lower, upper]
 def scale(x, lower, upper):
@@ -37,53 +51,44 @@ def unscale(x, lower, upper):
 
 #-----------------------------------------------------------------------------------
 #Isaac has custom ranges from -1 to 1 so we convert that to LEAPHand real world
-def sim_ones_to_LEAPhand(joints, hack_thumb = False):
-    sim_min, sim_max = LEAPsim_limits(type = hack_thumb)
-    joints = scale(joints, sim_min, sim_max)
-    joints = LEAPsim_to_LEAPhand(joints)
-    return joints
+def sim_ones_to_LEAPhand(joints, hack_thumb = False, out = None):
+    out = np.multiply(joints, _ONES_SCALE, out = out)
+    out += _ONES_OFFSET
+    return out
 #LEAPHand real world to Isaac has custom ranges from -1 to 1
-def LEAPhand_to_sim_ones(joints, hack_thumb = False):
-    joints = LEAPhand_to_LEAPsim(joints)
-    sim_min, sim_max = LEAPsim_limits(type = hack_thumb)
-    joints = unscale(joints, sim_min, sim_max)
-    return joints
+def LEAPhand_to_sim_ones(joints, hack_thumb = False, out = None):
+    out = np.subtract(joints, _ONES_OFFSET, out = out)
+    out /= _ONES_SCALE
+    return out
 
 #-----------------------------------------------------------------------------------
 ###Sim LEAP hand to real leap hand  Sim is allegro-like but all 16 joints are usable.
-def LEAPsim_to_LEAPhand(joints):
-    joints = np.array(joints)
-    ret_joints = joints + 3.14159
-    return ret_joints
+def LEAPsim_to_LEAPhand(joints, out = None):
+    return np.add(joints, 3.14159, out = out)
 ###Real LEAP hand to sim leap hand  Sim is allegro-like but all 16 joints are usable.
-def LEAPhand_to_LEAPsim(joints):
-    joints = np.array(joints)
-    ret_joints = joints - 3.14159
-    return ret_joints
+def LEAPhand_to_LEAPsim(joints, out = None):
+    return np.subtract(joints, 3.14159, out = out)
 
 #-----------------------------------------------------------------------------------
 #Converts allegrohand radians to LEAP (radians)
 #Only converts the joints that match, all 4 of the thumb and the outer 3 for each of the other fingers
 #All the clockwise/counterclockwise signs are the same between the two hands.  Just the offset (mostly 180 degrees off)
-def allegro_to_LEAPhand(joints, teleop = False, zeros = True):
-    joints = np.array(joints)
-    ret_joints = joints + 3.14159
+def allegro_to_LEAPhand(joints, teleop = False, zeros = True, out = None):
+    ret_joints = np.add(joints, 3.14159, out = out)
     if zeros:
-        ret_joints[0] = ret_joints[4] = ret_joints[8] = 3.14
+        ret_joints[..., [0, 4, 8]] = 3.14
     if teleop:
-        ret_joints[12] = joints[12] + 0.2
-        ret_joints[14] = joints[14] - 0.2
+        #Thumb joints 12 and 14 keep the allegro value, shifted by 0.2
+        ret_joints[..., 12] -= 3.14159 - 0.2
+        ret_joints[..., 14] -= 3.14159 + 0.2
     return ret_joints
 # Converts LEAP to allegrohand (radians)
-def LEAPhand_to_allegro(joints, teleop = False, zeros = True):
-    joints = np.array(joints)
-    ret_joints = joints - 3.14159
+def LEAPhand_to_allegro(joints, teleop = False, zeros = True, out = None):
+    ret_joints = np.subtract(joints, 3.14159, out = out)
     if zeros:
-        ret_joints[0] = ret_joints[4] = ret_joints[8] = 0
+        ret_joints[..., [0, 4, 8]] = 0
     if teleop:
-        ret_joints[12] = joints[12] - 0.2
-        ret_joints[14] = joints[14] + 0.2
+        ret_joints[..., 12] += 3.14159 - 0.2
+        ret_joints[..., 14] += 3.14159 + 0.2
     return ret_joints
 #-----------------------------------------------------------------------------------
-
-
@@ -1,5 +1,11 @@
 import leap_hand_utils.leap_hand_utils as lhu
+from leap_hand_utils.bus_health import BusHealthMonitor
+from leap_hand_utils.command_shaper import CommandShaper
 from leap_hand_utils.dynamixel_client import *
+from leap_hand_utils.motor_config import MotorConfigProfile, apply_profile
+from leap_hand_utils.telemetry import JointTelemetry
+from leap_hand_utils.trajectory_recorder import TrajectoryRecorder
+import logging
 import numpy as np
 import os
 import pickle
@@ -15,51 +21,237 @@ class LeapNode:
         self.kI = cfg.get("kI", 0)
         self.kD = cfg.get("kD", 100)
         self.init_pos = cfg.get("init_pos", None)
+        # Reads within this many seconds share one bus transaction.
+        self.state_max_age = cfg.get("state_max_age", 0.0)
+        self.read_backend = cfg.get("read_backend", "bulk")
+        # If set, a dedicated thread owns goal/state bus traffic at this rate.
+        self.bus_rate = cfg.get("bus_rate", None)
+        # Optional time.monotonic() time the bus cycles are aligned to, so the
+        # buses of several hands run in phase.
+        self.bus_start_time = cfg.get("bus_start_time", None)
+        # Skip goal writes for joints whose target moved by <= deadband ticks.
+        self.suppress_unchanged_goals = cfg.get("suppress_unchanged_goals", False)
+        self.goal_deadband = cfg.get("goal_deadband", 0)
+        # If >0, logs bus latency/error statistics every this many seconds.
+        self.stats_log_interval = cfg.get("stats_log_interval", 0.0)
+        # Read temperature and hardware error status along with the state.
+        self.use_indirect_state = cfg.get("use_indirect_state", False)
+        # Free drag update rate in Hz; None runs the loop as fast as the bus allows.
+        self.free_drag_rate = cfg.get("free_drag_rate", 200)
+        # Clamp set_leap/set_allegro/set_ones goals to the joint limits.
+        self.safety_clip = cfg.get("safety_clip", True)
+        # If set, goals are smoothed by a velocity/acceleration/jerk limited
+        # shaper streaming at this rate in Hz instead of being sent as steps.
+        self.command_rate = cfg.get("command_rate", None)
+        # Number of commanded vs. measured samples kept; 0 disables telemetry.
+        # Samples are taken on every state read, so set bus_rate for a
+        # continuous stream.
+        self.telemetry_capacity = cfg.get("telemetry_capacity", 0)
+        # Seconds between bus health checks, which isolate unresponsive motors
+        # and reopen the port in the background; None disables monitoring.
+        self.health_interval = cfg.get("health_interval", None)
 
         if self.init_pos is not None:
             self.prdev_pos = self.pos = self.curr_pos = self.init_pos
         else:
             self.prdev_pos = self.pos = self.curr_pos = lhu.allegro_to_LEAPhand(np.zeros(16))
 
-        self.motors = motors = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]
+        # Motor IDs in joint order; hands sharing a numbering scheme must be on
+        # separate ports.
+        self.motors = motors = list(cfg.get("motor_ids", range(16)))
+        if len(motors) != 16:
+            raise ValueError("A LEAP hand needs 16 motor IDs, got {}.".format(len(motors)))
 
-        self.dxl_client = DynamixelClient(motors, '/dev/ttyUSB0', 4000000)
+        self._goal_buffers = np.zeros((2, len(motors)))
+        self._joint_min = np.zeros(len(motors))
+        self._joint_max = np.zeros(len(motors))
+        self.set_joint_limits()
+        self._clip_mask = np.zeros(len(motors), dtype=bool)
+        self._clip_above = np.zeros(len(motors), dtype=bool)
+        self.clip_counts = np.zeros(len(motors), dtype=np.int64)
+        self.num_commands = 0
+        self.num_clipped_commands = 0
+
+        self.port = cfg.get("port", "/dev/ttyUSB0")
+        self.baudrate = cfg.get("baudrate", 4000000)
+        # If set to a dict of SimulatedPortHandler options, runs against a
+        # simulated hand instead of the serial port.
+        self.sim_cfg = cfg.get("sim", None)
+        port_handler = None
+        if self.sim_cfg is not None:
+            from leap_hand_utils.dynamixel_sim import make_simulated_port
+            port_handler = make_simulated_port(motors, self.baudrate, **self.sim_cfg)
+
+        self.dxl_client = DynamixelClient(motors, self.port, self.baudrate,
+                                          state_max_age=self.state_max_age,
+                                          read_backend=self.read_backend,
+                                          suppress_unchanged_goals=self.suppress_unchanged_goals,
+                                          goal_deadband=self.goal_deadband,
+                                          port_handler=port_handler,
+                                          stats_log_interval=self.stats_log_interval,
+                                          use_indirect_state=self.use_indirect_state)
+        # The goal last written to the bus, recorded against each state read.
+        self._commanded = np.array(self.curr_pos, dtype=np.float64)
+        self.telemetry = None
+        if self.telemetry_capacity:
+            self.telemetry = JointTelemetry(len(motors), self.telemetry_capacity)
+            self.dxl_client.state_listeners.append(self._on_state)
+        self._recorder = None
+        self.dxl_client.state_listeners.append(self._record_state)
         self.dxl_client.connect()
 
-        self.dxl_client.sync_write(motors, np.ones(len(motors)) * 5, 11, 1)
-        self.dxl_client.set_torque_enabled(motors, True)
-        self.dxl_client.sync_write(motors, np.ones(len(motors)) * self.kP, 84, 2) 
-        self.dxl_client.sync_write([0, 4, 8], np.ones(3) * (self.kP * 0.75), 84, 2) 
-        self.dxl_client.sync_write(motors, np.ones(len(motors)) * self.kI, 82, 2)  
-        self.dxl_client.sync_write(motors, np.ones(len(motors)) * self.kD, 80, 2) 
-        self.dxl_client.sync_write([0, 4, 8], np.ones(3) * (self.kD * 0.75), 80, 2)  
-        self.dxl_client.sync_write(motors, np.ones(len(motors)) * self.curr_lim, 102, 2)
+        # Configure all motors with a few verified bulk writes; a restart
+        # with an already configured hand skips the writes entirely.
+        if not apply_profile(self.dxl_client, self._make_motor_profile()):
+            raise OSError("Failed to configure the LEAP hand motors.")
 
-        self.dxl_client.write_desired_pos(self.motors, self.curr_pos)
+        self._write_goal(self.curr_pos)
+        if self.bus_rate:
+            self.dxl_client.start_bus_thread(self.bus_rate, self.bus_start_time)
+        self.health_monitor = None
+        if self.health_interval:
+            self.health_monitor = BusHealthMonitor(self.dxl_client,
+                                                   interval=self.health_interval,
+                                                   on_recover=self._reconfigure_motors)
+            self.health_monitor.start()
+        self.command_shaper = None
+        if self.command_rate:
+            self.command_shaper = CommandShaper(self._write_goal, self.curr_pos,
+                                                rate=self.command_rate,
+                                                max_vel=cfg.get("command_max_vel", 6.0),
+                                                max_acc=cfg.get("command_max_acc", 60.0),
+                                                max_jerk=cfg.get("command_max_jerk", 3000.0),
+                                                pos_gain=cfg.get("command_gain", 15.0),
+                                                clip_fn=self._clamp_goal if self.safety_clip else None)
+            self.command_shaper.start()
 
         self.free_drag_active = False
         self.free_drag_thread = None
+        self._drag_periods = np.zeros(1024)
+        self._drag_count = 0
+        self._drag_overruns = 0
         self.original_curr_lim = self.curr_lim 
         self.original_kP = self.kP
         self.original_kI = self.kI
         self.original_kD = self.kD
 
+    def _reconfigure_motors(self, motor_ids):
+        # Motors that come back after a brown-out have lost their RAM settings,
+        # including the indirect state mapping. Only touch those motors: the
+        # others may still be isolated, and EEPROM writes would toggle torque
+        # on the whole hand.
+        profile = self._make_motor_profile().subset(motor_ids)
+        configured = apply_profile(self.dxl_client, profile)
+        if self.use_indirect_state:
+            # Map even if the profile failed, so their state decodes correctly.
+            configured = self.dxl_client.configure_indirect_state(motor_ids) and configured
+        return configured
+
+    def get_bus_health(self):
+        """Returns the bus health status, or None if monitoring is disabled."""
+        if self.health_monitor is None:
+            return None
+        return self.health_monitor.get_status()
+
+    def _make_motor_profile(self):
+        # Current-based position control, with softer gains on the MCP side joints.
+        gain_scale = np.ones(len(self.motors))
+        gain_scale[[0, 4, 8]] = 0.75
+        profile = MotorConfigProfile(self.motors, torque_enabled=True)
+        profile.set(ADDR_OPERATING_MODE, 1, 5)
+        profile.set(ADDR_POSITION_P_GAIN, 2, self.kP * gain_scale)
+        profile.set(ADDR_POSITION_I_GAIN, 2, self.kI)
+        profile.set(ADDR_POSITION_D_GAIN, 2, self.kD * gain_scale)
+        profile.set(ADDR_GOAL_CURRENT, 2, self.curr_lim)
+        return profile
+
+    # Commands are converted into whichever of the two goal buffers is not the
+    # current goal, clamped in place, and then become the current goal.
+    def _next_goal_buffer(self):
+        if self.curr_pos is self._goal_buffers[0]:
+            return self._goal_buffers[1]
+        return self._goal_buffers[0]
+
     def set_leap(self, pose):
-        self.prev_pos = self.curr_pos
-        self.curr_pos = np.array(pose)
-        self.dxl_client.write_desired_pos(self.motors, self.curr_pos)
+        goal = self._next_goal_buffer()
+        np.copyto(goal, pose)
+        self._apply_goal(goal)
 
     def set_allegro(self, pose):
-        pose = lhu.allegro_to_LEAPhand(pose, zeros=False)
-        self.prev_pos = self.curr_pos
-        self.curr_pos = np.array(pose)
-        self.dxl_client.write_desired_pos(self.motors, self.curr_pos)
+        self._apply_goal(lhu.allegro_to_LEAPhand(pose, zeros=False, out=self._next_goal_buffer()))
 
     def set_ones(self, pose):
-        pose = lhu.sim_ones_to_LEAPhand(np.array(pose))
+        self._apply_goal(lhu.sim_ones_to_LEAPhand(pose, out=self._next_goal_buffer()))
+
+    def _apply_goal(self, goal):
+        if self.safety_clip:
+            self._clip_goal(goal)
         self.prev_pos = self.curr_pos
-        self.curr_pos = np.array(pose)
-        self.dxl_client.write_desired_pos(self.motors, self.curr_pos)
+        self.curr_pos = goal
+        self._send_goal(goal)
+
+    def _clip_goal(self, goal):
+        mask, above = self._clip_mask, self._clip_above
+        np.less(goal, self._joint_min, out=mask)
+        np.greater(goal, self._joint_max, out=above)
+        mask |= above
+        self.num_commands += 1
+        if mask.any():
+            self.num_clipped_commands += 1
+            self.clip_counts += mask
+            self._clamp_goal(goal)
+
+    def _clamp_goal(self, goal):
+        # The only clamp to the active limits; the command shaper also applies
+        # it to every goal it streams, which only leaves the limits when the
+        # shaped profile overshoots, so those clamps are not counted.
+        np.clip(goal, self._joint_min, self._joint_max, out=goal)
+
+    def set_joint_limits(self, lower=None, upper=None):
+        """Tightens the goal clamp, e.g. to the range of the current type.
+
+        The limits are intersected with the hand's safety limits; passing
+        None resets that side to the safety limits.
+        """
+        hand_min, hand_max = lhu.LEAPhand_limits()
+        # Update in one copy each: the command shaper clamps concurrently.
+        np.copyto(self._joint_min, hand_min if lower is None else np.maximum(hand_min, lower))
+        np.copyto(self._joint_max, hand_max if upper is None else np.minimum(hand_max, upper))
+
+    def get_clip_stats(self):
+        return {
+            "commands": self.num_commands,
+            "clipped_commands": self.num_clipped_commands,
+            "per_joint": self.clip_counts.tolist(),
+        }
+
+    def _write_goal(self, pos):
+        np.copyto(self._commanded, pos)
+        self.dxl_client.write_desired_pos(self.motors, pos)
+
+    def _on_state(self, state):
+        self.telemetry.record(self._commanded, state)
+
+    def get_telemetry(self):
+        """Returns per-joint tracking-error and current statistics."""
+        if self.telemetry is None:
+            return None
+        return self.telemetry.summary()
+
+    def _send_goal(self, pos):
+        if self.command_shaper is not None:
+            self.command_shaper.set_target(pos)
+        else:
+            self._write_goal(pos)
+
+    def close(self):
+        """Stops the command shaper and disconnects from the hand."""
+        self.disable_free_drag_mode()
+        if self.command_shaper is not None:
+            self.command_shaper.stop()
+        if self.health_monitor is not None:
+            self.health_monitor.stop()
+        self.dxl_client.disconnect()
 
     def read_pos(self):
         return self.dxl_client.read_pos()
@@ -70,11 +262,28 @@ class LeapNode:
     def read_cur(self):
         return self.dxl_client.read_cur()
 
+    def read_state(self, max_age=None):
+        # max_age=np.inf returns the latest snapshot without a bus read.
+        return self.dxl_client.read_state(max_age)
+
+    def read_health(self):
+        # Only populated with use_indirect_state; None otherwise.
+        state = self.read_state()
+        return {"temperature": state.temperature, "hardware_error": state.hardware_error}
+
+    def get_write_stats(self):
+        return self.dxl_client.get_goal_write_stats()
+
+    def get_bus_stats(self):
+        return self.dxl_client.get_stats()
+
     def enable_free_drag_mode(self):
         if self.free_drag_active:
             return
         
         self.filtered_current = self.read_cur()
+        if self.command_shaper is not None:
+            self.command_shaper.pause()
 
         self.original_curr_lim = self.curr_lim
         self.curr_lim = 30 
@@ -90,46 +299,116 @@ class LeapNode:
         self.free_drag_active = False
         if self.free_drag_thread is not None:
             self.free_drag_thread.join()
-        
+        self.stop_recording()
+        logging.info("Free drag loop: %s", self.get_free_drag_stats())
+
         self.curr_lim = self.original_curr_lim
         self.dxl_client.sync_write(self.motors, np.ones(len(self.motors)) * self.curr_lim, 102, 2)
 
         current_pos = self.read_pos()
-        self.dxl_client.write_desired_pos(self.motors, current_pos)
+        self._write_goal(current_pos)
+        if self.command_shaper is not None:
+            self.command_shaper.resume(current_pos)
         self.free_drag_thread = None
 
-    def _update_goal_pos_loop(self):
-        thresholds = np.array([0.05]*16) 
-        loop_time = 0
+    @property
+    def is_recording(self):
+        return self._recorder is not None
 
-        while self.free_drag_active:
-            start_time = time.time()
+    def start_recording(self, path, **kwargs):
+        """Streams every state read from the bus to a .npy file while free drag is active.
 
-            current_pos = self.read_pos()
-            current_vel = self.read_vel() 
-            pos_error = current_pos - self.curr_pos
+        With `bus_rate` set, every bus thread cycle is recorded, independent
+        of `free_drag_rate`. Without it, the samples are the free drag loop's
+        reads at `free_drag_rate`. Reads from other threads are not recorded.
+        """
+        if self._recorder is not None:
+            self.stop_recording()
+        recorder = TrajectoryRecorder(path, num_joints=len(self.motors), **kwargs)
+        recorder.start()
+        self._recorder = recorder
 
-            delta_pos = np.zeros(16)
-            for i in range(16):
-                if pos_error[i] > thresholds[i] + 0.05:
-                    delta_pos[i] = current_vel[i] * loop_time * 5
-                else:
-                    delta_pos[i] = current_vel[i] * loop_time
+    def _record_state(self, state):
+        # Runs on the reading thread, but the recorder's ring buffer takes a
+        # single producer. While the bus thread runs it is the only thread
+        # that reads the bus; otherwise only the free drag loop's reads count.
+        recorder = self._recorder
+        if (recorder is not None and self.free_drag_active
+                and (self.dxl_client.bus_thread_active
+                     or threading.current_thread() is self.free_drag_thread)):
+            recorder.append(state)
+
+    def stop_recording(self):
+        """Stops recording and returns the number of samples written."""
+        recorder, self._recorder = self._recorder, None
+        if recorder is None:
+            return 0
+        return recorder.stop()
 
-            new_target_pos = current_pos + delta_pos
+    def get_free_drag_stats(self):
+        """Returns the loop period statistics of the last free drag run."""
+        periods = self._drag_periods[:min(self._drag_count, len(self._drag_periods))]
+        if len(periods) == 0:
+            return {"count": 0}
+        target = 1.0 / self.free_drag_rate if self.free_drag_rate else None
+        stats = {
+            "count": self._drag_count,
+            "rate_hz": float(1.0 / periods.mean()),
+            "period_p50_ms": float(np.percentile(periods, 50) * 1000),
+            "period_p99_ms": float(np.percentile(periods, 99) * 1000),
+            "period_max_ms": float(periods.max() * 1000),
+            "overruns": self._drag_overruns,
+        }
+        if target is not None:
+            stats["jitter_max_ms"] = float(np.abs(periods - target).max() * 1000)
+        return stats
 
-            pos_diff = np.abs(new_target_pos - self.curr_pos)
-            update_mask = pos_diff > thresholds
-            updated_positions = np.where(update_mask, new_target_pos, self.curr_pos)
+    def _update_goal_pos_loop(self):
+        # Targets of joints being pushed away from their goal (error above
+        # threshold + 0.05 rad) follow the measured velocity 5x faster.
+        thresholds = np.full(16, 0.05)
+        boost_thresholds = thresholds + 0.05
+        pos_error = np.empty(16)
+        gain = np.empty(16)
+        new_target_pos = np.empty(16)
+        update_mask = np.empty(16, dtype=bool)
+        # The loop owns its goal array and updates it in place.
+        self.curr_pos = np.array(self.curr_pos, dtype=np.float64)
+
+        self._drag_periods[:] = 0
+        self._drag_count = 0
+        self._drag_overruns = 0
+        period = 1.0 / self.free_drag_rate if self.free_drag_rate else 0.0
+        loop_time = 0.0
+        last_time = next_time = time.perf_counter()
 
-            self.dxl_client.write_desired_pos(self.motors, updated_positions)
-            self.curr_pos = updated_positions
+        while self.free_drag_active:
+            state = self.read_state()
 
-            joints = updated_positions - 3.14159
-            index = np.array([9, 8, 10, 11, 5, 4, 6, 7, 1, 0, 2, 3, 12, 13, 14, 15])
+            np.subtract(state.pos, self.curr_pos, out=pos_error)
+            np.greater(pos_error, boost_thresholds, out=update_mask)
+            np.multiply(update_mask, 4.0 * loop_time, out=gain)
+            gain += loop_time
+            np.multiply(state.vel, gain, out=new_target_pos)
+            new_target_pos += state.pos
 
-            inverse_index = np.argsort(index)  
-            input_pos = np.array(joints)[inverse_index]
+            np.subtract(new_target_pos, self.curr_pos, out=pos_error)
+            np.abs(pos_error, out=pos_error)
+            np.greater(pos_error, thresholds, out=update_mask)
+            np.copyto(self.curr_pos, new_target_pos, where=update_mask)
+            self._write_goal(self.curr_pos)
 
-            end_time = time.time()
-            loop_time = end_time - start_time
\ No newline at end of file
+            if period:
+                next_time += period
+                sleep_time = next_time - time.perf_counter()
+                if sleep_time > 0:
+                    time.sleep(sleep_time)
+                else:
+                    # Overran; do not try to catch up on missed cycles.
+                    self._drag_overruns += 1
+                    next_time = time.perf_counter()
+            now = time.perf_counter()
+            loop_time = now - last_time
+            last_time = now
+            self._drag_periods[self._drag_count % len(self._drag_periods)] = loop_time
+            self._drag_count += 1
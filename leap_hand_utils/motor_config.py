@@ -0,0 +1,153 @@
+"""Declarative control table configuration for a group of Dynamixel motors."""
+import logging
+import time
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+from leap_hand_utils.dynamixel_client import (
+    ADDR_TORQUE_ENABLE,
+    DynamixelClient,
+)
+
+# Addresses below this are EEPROM and can only be written with torque off.
+EEPROM_END = 64
+
+
+class MotorConfigProfile:
+    """The control table values a group of motors should be configured with.
+
+    Registers are declared with `set`. `apply_profile` merges adjacent
+    registers into blocks, so e.g. the D/I/P position gains (80..85) go out
+    in a single Sync Write with per-motor values.
+    """
+
+    def __init__(self, motor_ids: Sequence[int], torque_enabled: bool = True):
+        """Initializes an empty profile.
+
+        Args:
+            motor_ids: The motor IDs the profile applies to.
+            torque_enabled: Whether torque is enabled after configuration.
+        """
+        self.motor_ids = list(motor_ids)
+        self.torque_enabled = torque_enabled
+        # Address -> (size, per-motor values).
+        self.registers = {}
+
+    def set(self, address: int, size: int,
+            values: Union[int, float, Sequence[float]]) -> 'MotorConfigProfile':
+        """Declares the value of a register, either shared or per motor.
+
+        Values are truncated to integers like `DynamixelClient.sync_write`.
+        """
+        if address <= ADDR_TORQUE_ENABLE < address + size:
+            raise ValueError('Use torque_enabled to configure the torque.')
+        values = np.broadcast_to(
+            np.asarray(values, dtype=np.float64), (len(self.motor_ids),))
+        self.registers[address] = (size, values.astype(np.int64))
+        return self
+
+    def subset(self, motor_ids: Sequence[int]) -> 'MotorConfigProfile':
+        """Returns the profile restricted to some of its motors."""
+        indices = [self.motor_ids.index(motor_id) for motor_id in motor_ids]
+        profile = MotorConfigProfile(motor_ids, self.torque_enabled)
+        for address, (size, values) in self.registers.items():
+            profile.registers[address] = (size, values[indices])
+        return profile
+
+    def blocks(self) -> List[Tuple[int, np.ndarray]]:
+        """Returns the registers merged into contiguous blocks.
+
+        Returns:
+            (address, data) pairs, where data is a (num_motors, size) uint8
+            array of the little-endian bytes of each motor.
+        """
+        blocks = []
+        for address in sorted(self.registers):
+            size, values = self.registers[address]
+            data = values.astype('<u{}'.format(size)).view(np.uint8).reshape(
+                len(self.motor_ids), size)
+            if blocks:
+                prev_address, prev_data = blocks[-1]
+                # Never merge across the EEPROM/RAM boundary.
+                if (prev_address + prev_data.shape[1] == address and
+                        (prev_address < EEPROM_END) == (address < EEPROM_END)):
+                    blocks[-1] = (prev_address, np.hstack([prev_data, data]))
+                    continue
+            blocks.append((address, data))
+        return blocks
+
+
+def _read_span(client: DynamixelClient, motor_ids: Sequence[int], start: int,
+               end: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Reads the bytes start..end-1 of all motors in one group read."""
+    dtype = np.dtype([('raw', 'u1', (end - start,))])
+    records, valid = client.read_block(motor_ids, start, dtype)
+    return records['raw'], valid
+
+
+def _mismatched(raw: np.ndarray, valid: np.ndarray, start: int, address: int,
+                data: np.ndarray) -> np.ndarray:
+    """Returns the mask of motors whose block differs from `data`."""
+    offset = address - start
+    current = raw[:, offset:offset + data.shape[1]]
+    return ~valid | np.any(current != data, axis=1)
+
+
+def apply_profile(client: DynamixelClient,
+                  profile: MotorConfigProfile,
+                  retries: int = 3) -> bool:
+    """Configures the motors, skipping what is already configured.
+
+    The whole configured address span is read once. Blocks that already
+    match on every motor are not written; the rest are written with one Sync
+    Write each, EEPROM blocks with torque disabled. The span is then read
+    back, and mismatched blocks are rewritten up to `retries` times.
+
+    Returns:
+        Whether all motors were verified to match the profile.
+    """
+    start_time = time.monotonic()
+    motor_ids = profile.motor_ids
+    blocks = profile.blocks()
+    torque = np.full((len(motor_ids), 1), int(profile.torque_enabled),
+                     dtype=np.uint8)
+    blocks_and_torque = blocks + [(ADDR_TORQUE_ENABLE, torque)]
+    start = min(address for address, _ in blocks_and_torque)
+    end = max(address + data.shape[1] for address, data in blocks_and_torque)
+
+    raw, valid = _read_span(client, motor_ids, start, end)
+    for attempt in range(retries + 1):
+        pending = [(address, data) for address, data in blocks
+                   if _mismatched(raw, valid, start, address, data).any()]
+        torque_pending = _mismatched(raw, valid, start, ADDR_TORQUE_ENABLE,
+                                     torque).any()
+        if not pending and not torque_pending:
+            if attempt == 0:
+                logging.info('Motors already configured; skipped writes.')
+            else:
+                logging.info('Configured motors in %.3f s.',
+                             time.monotonic() - start_time)
+            return True
+        if attempt == retries:
+            break
+
+        if any(address < EEPROM_END for address, _ in pending):
+            client.sync_write_bytes(motor_ids, [b'\x00'] * len(motor_ids),
+                                    ADDR_TORQUE_ENABLE)
+            torque_pending = True
+        for address, data in pending:
+            client.sync_write_bytes(motor_ids, [row.tobytes() for row in data],
+                                    address)
+        if torque_pending:
+            client.sync_write_bytes(motor_ids,
+                                    [row.tobytes() for row in torque],
+                                    ADDR_TORQUE_ENABLE)
+        raw, valid = _read_span(client, motor_ids, start, end)
+
+    failed = np.zeros(len(motor_ids), dtype=bool)
+    for address, data in blocks_and_torque:
+        failed |= _mismatched(raw, valid, start, address, data)
+    logging.error('Could not configure motors: %s',
+                  str([m for m, f in zip(motor_ids, failed) if f]))
+    return False
@@ -0,0 +1,106 @@
+"""Drives several LEAP hands, each on its own bus, in parallel.
+
+Every hand gets its own DynamixelClient bus thread, so adding a hand adds a
+bus running concurrently instead of halving the control rate. The bus
+threads share a cycle grid (same rate and start time), so goals published
+together go out on the same cycle of every bus, and states read together
+were sampled within one cycle of each other.
+
+Example:
+    with MultiHandCoordinator({
+        "left": {"port": "/dev/ttyUSB0"},
+        "right": {"port": "/dev/ttyUSB1"},
+    }) as hands:
+        stamp = hands.set_leap({"left": left_pose, "right": right_pose})
+        stamp, states = hands.read_states()
+"""
+import threading
+import time
+from typing import Dict, Tuple
+
+from leap_hand_utils.leap_node import LeapNode
+
+
+class MultiHandCoordinator:
+    """Owns a set of named LeapNodes and commands them with shared timestamps."""
+
+    def __init__(self, hand_cfgs: Dict[str, dict], bus_rate: float = 200.0):
+        """
+        Args:
+            hand_cfgs: LeapNode cfg per hand name. Each hand must have its own
+                "port" (or be simulated).
+            bus_rate: The bus cycle rate of every hand in Hz, unless a cfg sets
+                its own "bus_rate".
+        """
+        ports = [cfg.get("port", "/dev/ttyUSB0") for cfg in hand_cfgs.values()
+                 if cfg.get("sim") is None]
+        if len(ports) != len(set(ports)):
+            raise ValueError("Each hand needs its own port, got {}.".format(ports))
+
+        self.start_time = time.monotonic()
+        self.command_time = None
+        self.hands = {}
+        errors = {}
+
+        def bring_up(name, cfg):
+            cfg = dict(cfg)
+            cfg.setdefault("bus_rate", bus_rate)
+            cfg["bus_start_time"] = self.start_time
+            try:
+                self.hands[name] = LeapNode(cfg)
+            except Exception as e:
+                errors[name] = e
+
+        # Connecting and configuring is I/O bound, so bring the hands up together.
+        threads = [threading.Thread(target=bring_up, args=item) for item in hand_cfgs.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            self.close()
+            name, error = next(iter(errors.items()))
+            raise OSError("Failed to bring up hand '{}': {}".format(name, error)) from error
+
+    def __getitem__(self, name: str) -> LeapNode:
+        return self.hands[name]
+
+    def _command(self, method: str, poses: Dict[str, object]) -> float:
+        stamp = time.monotonic()
+        for name, pose in poses.items():
+            getattr(self.hands[name], method)(pose)
+        self.command_time = stamp
+        return stamp
+
+    def set_leap(self, poses: Dict[str, object]) -> float:
+        """Commands LEAP poses per hand; returns the shared command timestamp."""
+        return self._command("set_leap", poses)
+
+    def set_allegro(self, poses: Dict[str, object]) -> float:
+        return self._command("set_allegro", poses)
+
+    def set_ones(self, poses: Dict[str, object]) -> float:
+        return self._command("set_ones", poses)
+
+    def read_states(self) -> Tuple[float, Dict[str, object]]:
+        """Returns the latest state of every hand and the time they were taken.
+
+        The states come from the bus threads without touching the buses; each
+        state carries its own sample timestamp.
+        """
+        stamp = time.monotonic()
+        return stamp, {name: node.read_state() for name, node in self.hands.items()}
+
+    def get_bus_stats(self) -> Dict[str, dict]:
+        return {name: node.get_bus_stats() for name, node in self.hands.items()}
+
+    def close(self):
+        for node in self.hands.values():
+            node.close()
+        self.hands = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,69 @@
+"""Preallocated single-producer/single-consumer ring buffer of records."""
+import numpy as np
+
+
+class RingBuffer:
+    """A fixed-capacity FIFO of NumPy records that never allocates.
+
+    One thread appends and one thread consumes. The producer writes a record
+    before publishing it by advancing `head`, and the consumer frees slots by
+    advancing `tail`; each counter has a single writer, so no lock is needed.
+    When full, new records are dropped and counted rather than blocking the
+    producer, or with `overwrite` replace the oldest records, for buffers
+    that are only ever inspected with `latest`.
+    """
+
+    def __init__(self, capacity: int, dtype, overwrite: bool = False):
+        self.capacity = capacity
+        self.overwrite = overwrite
+        self.data = np.zeros(capacity, dtype=dtype)
+        # Total records published and consumed; indices are modulo capacity.
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self.head - self.tail
+
+    def append(self, record) -> bool:
+        """Copies a record (tuple or structured scalar) into the buffer.
+
+        Returns:
+            False if the buffer was full and the record was dropped.
+        """
+        if self.head - self.tail >= self.capacity:
+            if not self.overwrite:
+                self.dropped += 1
+                return False
+            self.tail += 1
+        self.data[self.head % self.capacity] = record
+        self.head += 1
+        return True
+
+    def peek(self, max_count: int = None) -> np.ndarray:
+        """Returns a view of the oldest contiguous unconsumed records.
+
+        The view stops at the end of the storage, so a wrapped backlog takes
+        two calls. It stays valid until the records are `advance`d past.
+        """
+        count = self.head - self.tail
+        start = self.tail % self.capacity
+        count = min(count, self.capacity - start)
+        if max_count is not None:
+            count = min(count, max_count)
+        return self.data[start:start + count]
+
+    def advance(self, count: int):
+        """Marks the oldest `count` records as consumed."""
+        self.tail += min(count, self.head - self.tail)
+
+    def latest(self, count: int) -> np.ndarray:
+        """Returns a copy of the newest `count` records, oldest first.
+
+        Safe to call from another thread while the producer appends, since
+        the slot the producer may be writing is never included.
+        """
+        head = self.head
+        count = min(count, head - self.tail, self.capacity - 1)
+        indices = np.arange(head - count, head) % self.capacity
+        return self.data[indices]
@@ -0,0 +1,107 @@
+"""Commanded vs. measured joint telemetry with incremental statistics.
+
+`JointTelemetry.record` is called from the thread that reads the bus. It
+copies the sample into a preallocated overwrite ring and updates running
+tracking-error and current statistics (Welford's algorithm) in place, without
+taking locks. Other threads inspect it through `latest` and `summary`, which
+copy what they read; a summary taken while a sample is being recorded may mix
+that sample into some joints but not others, which is fine for monitoring.
+"""
+import numpy as np
+
+from leap_hand_utils.ring_buffer import RingBuffer
+
+
+def telemetry_dtype(num_joints: int = 16) -> np.dtype:
+    """Returns the record layout of one telemetry sample."""
+    return np.dtype([
+        ('t', '<f8'),
+        ('cmd', '<f4', (num_joints,)),
+        ('pos', '<f4', (num_joints,)),
+        ('vel', '<f4', (num_joints,)),
+        ('cur', '<f4', (num_joints,)),
+    ])
+
+
+class RunningStats:
+    """Per-joint count, mean, variance and max |x| updated in place."""
+
+    def __init__(self, num_joints: int):
+        self.count = 0
+        self.mean = np.zeros(num_joints)
+        self.m2 = np.zeros(num_joints)
+        self.max_abs = np.zeros(num_joints)
+        self._delta = np.zeros(num_joints)
+        self._tmp = np.zeros(num_joints)
+
+    def update(self, x: np.ndarray):
+        self.count += 1
+        np.subtract(x, self.mean, out=self._delta)
+        np.divide(self._delta, self.count, out=self._tmp)
+        self.mean += self._tmp
+        np.subtract(x, self.mean, out=self._tmp)
+        self._tmp *= self._delta
+        self.m2 += self._tmp
+        np.abs(x, out=self._tmp)
+        np.maximum(self.max_abs, self._tmp, out=self.max_abs)
+
+    def reset(self):
+        self.count = 0
+        self.mean[:] = 0
+        self.m2[:] = 0
+        self.max_abs[:] = 0
+
+    def summary(self) -> dict:
+        count = self.count
+        mean = self.mean.copy()
+        var = self.m2 / max(count - 1, 1)
+        return {
+            'count': count,
+            'mean': mean,
+            'std': np.sqrt(var),
+            # E[x^2] = var + mean^2 (population variance for the RMS).
+            'rms': np.sqrt(self.m2 / max(count, 1) + mean ** 2),
+            'max_abs': self.max_abs.copy(),
+        }
+
+
+class JointTelemetry:
+    """Bounded history and running statistics of a hand's joint tracking."""
+
+    def __init__(self, num_joints: int = 16, capacity: int = 4096):
+        """Initializes empty telemetry.
+
+        Args:
+            num_joints: The number of joints per sample.
+            capacity: The number of most recent samples kept.
+        """
+        self.buffer = RingBuffer(capacity, telemetry_dtype(num_joints),
+                                 overwrite=True)
+        self.tracking_error = RunningStats(num_joints)
+        self.current = RunningStats(num_joints)
+        self._error = np.zeros(num_joints)
+
+    def record(self, cmd: np.ndarray, state):
+        """Records a commanded goal and the `DynamixelState` measured with it."""
+        self.buffer.append((state.timestamp, cmd, state.pos, state.vel,
+                            state.cur))
+        np.subtract(state.pos, cmd, out=self._error)
+        self.tracking_error.update(self._error)
+        self.current.update(state.cur)
+
+    def latest(self, count: int) -> np.ndarray:
+        """Returns a copy of the newest `count` samples, oldest first."""
+        return self.buffer.latest(count)
+
+    def summary(self) -> dict:
+        """Returns the tracking-error and current statistics per joint."""
+        return {
+            'samples': self.buffer.head,
+            'tracking_error': self.tracking_error.summary(),
+            'current': self.current.summary(),
+        }
+
+    def reset(self):
+        """Clears the running statistics; the history is kept."""
+        self.tracking_error.reset()
+        self.current.reset()
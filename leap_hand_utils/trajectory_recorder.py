@@ -0,0 +1,153 @@
+"""Streams joint state samples to a .npy file without blocking the caller.
+
+Example:
+    recorder = TrajectoryRecorder("demo.npy")
+    recorder.start()
+    ...
+    recorder.append(client.read_state())  # From the control loop.
+    ...
+    recorder.stop()
+    samples = load_trajectory("demo.npy")
+    samples["t"], samples["pos"], samples["vel"], samples["cur"]
+"""
+import logging
+import threading
+
+import numpy as np
+
+from leap_hand_utils.ring_buffer import RingBuffer
+
+
+def trajectory_dtype(num_joints: int = 16) -> np.dtype:
+    """Returns the record layout of one state sample."""
+    return np.dtype([
+        ('t', '<f8'),
+        ('pos', '<f4', (num_joints,)),
+        ('vel', '<f4', (num_joints,)),
+        ('cur', '<f4', (num_joints,)),
+    ])
+
+
+def _npy_header(dtype: np.dtype, length: int, size: int = None) -> bytes:
+    """Builds a version 1.0 .npy header for a 1-D array of records.
+
+    Args:
+        size: Total header size to pad to, so that the header written when
+            the length is known can replace the placeholder in place.
+    """
+    header = repr({
+        'descr': np.lib.format.dtype_to_descr(dtype),
+        'fortran_order': False,
+        'shape': (length,),
+    })
+    if size is None:
+        # Room for any length, aligned to 64 bytes like numpy does.
+        size = -(-(10 + len(header) + 21) // 64) * 64
+    header = header.ljust(size - 10 - 1) + '\n'
+    return (np.lib.format.magic(1, 0) +
+            np.uint16(len(header)).astype('<u2').tobytes() +
+            header.encode('latin1'))
+
+
+class TrajectoryRecorder:
+    """Records state samples into a ring buffer and flushes them in chunks.
+
+    `append` only copies the sample into preallocated memory; a background
+    thread writes it to disk, so the control loop never waits on file I/O.
+    """
+
+    def __init__(self,
+                 path: str,
+                 num_joints: int = 16,
+                 capacity: int = 8192,
+                 chunk_size: int = 256,
+                 flush_interval: float = 0.1):
+        """Initializes a new recorder.
+
+        Args:
+            path: The .npy file to write.
+            num_joints: The number of joints per sample.
+            capacity: The number of samples buffered in memory. At 200 Hz the
+                default covers 40 s of stalled disk writes.
+            chunk_size: The number of samples written to the file at once.
+            flush_interval: The maximum time between flushes in seconds.
+        """
+        self.path = path
+        self.dtype = trajectory_dtype(num_joints)
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.buffer = RingBuffer(capacity, self.dtype)
+        self.num_written = 0
+
+        self._file = None
+        self._header_size = 0
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def is_recording(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def num_dropped(self) -> int:
+        return self.buffer.dropped
+
+    def start(self):
+        """Opens the file and starts the flush thread."""
+        if self.is_recording:
+            return
+        self._file = open(self.path, 'wb')
+        header = _npy_header(self.dtype, 0)
+        self._header_size = len(header)
+        self._file.write(header)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def append(self, state) -> bool:
+        """Buffers a `DynamixelState` sample.
+
+        Returns:
+            False if the buffer was full and the sample was dropped.
+        """
+        return self.buffer.append(
+            (state.timestamp, state.pos, state.vel, state.cur))
+
+    def stop(self) -> int:
+        """Flushes the remaining samples and finalizes the file.
+
+        Returns:
+            The number of samples written.
+        """
+        if not self.is_recording:
+            return self.num_written
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self._flush()
+        self._file.seek(0)
+        self._file.write(
+            _npy_header(self.dtype, self.num_written, self._header_size))
+        self._file.close()
+        self._file = None
+        if self.num_dropped:
+            logging.warning('Trajectory recorder dropped %d samples.',
+                            self.num_dropped)
+        return self.num_written
+
+    def _flush(self):
+        """Writes all buffered samples in chunks."""
+        while len(self.buffer):
+            chunk = self.buffer.peek(self.chunk_size)
+            self._file.write(chunk.data)
+            self.num_written += len(chunk)
+            self.buffer.advance(len(chunk))
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self._flush()
+
+
+def load_trajectory(path: str) -> np.ndarray:
+    """Memory-maps a recorded trajectory as an array of records."""
+    return np.load(path, mmap_mode='r')
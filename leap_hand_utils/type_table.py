@@ -0,0 +1,146 @@
+"""Grasp types with N keyframes along the closure axis.
+
+A type file in `TypeLibrary/<category>/<type>.txt` holds one line of 16 saved
+joint values per keyframe, from fully open (first line) to fully closed (last
+line), evenly spaced along the closure axis. Two-line files are the classic
+open/close types and blend linearly, exactly as before.
+
+At load time the keyframes are resampled into a dense lookup table, so that
+evaluating a pose for per-joint closure ratios is a single vectorized table
+lookup whose cost does not depend on the number of keyframes.
+
+A type may come with tighter joint limits in `<type>.limits` next to its type
+file, see `load_type_limits`.
+"""
+import numpy as np
+
+# Reorder index consistent with the create script.
+_REORDER_INDEX = np.array([9, 8, 10, 11, 5, 4, 6, 7, 1, 0, 2, 3, 12, 13, 14, 15])
+_INVERSE_INDEX = np.argsort(_REORDER_INDEX)
+
+# Hardware joint indices driven by each finger's closure ratio.
+FINGER_JOINTS = {
+    "index": slice(0, 4),
+    "middle": slice(4, 8),
+    "ring": slice(8, 12),
+    "thumb": slice(12, 16),
+}
+
+
+def parse_line(line: str) -> np.ndarray:
+    """Parse a line of joint values (supports both space-separated and bracketed formats)."""
+    line = line.strip().strip('[]')
+    parts = [p for p in line.replace(',', ' ').split() if p]
+    vals = [float(p) for p in parts]
+    if len(vals) != 16:
+        raise ValueError(f"Invalid line length (expected 16): {line} -> {len(vals)}")
+    return np.array(vals, dtype=float)
+
+
+def read_type_file(type_file: str) -> np.ndarray:
+    """Read all keyframes of a type file in saved format, shape (K, 16)."""
+    with open(type_file, 'r', encoding='utf-8') as f:
+        keyframes = [parse_line(line) for line in f if line.strip()]
+    if len(keyframes) < 2:
+        raise ValueError(f"Type file needs at least 2 keyframes: {type_file}")
+    return np.stack(keyframes)
+
+
+def decode_saved(vecs: np.ndarray) -> np.ndarray:
+    """Convert saved format (..., 16) to hardware absolute positions (radians)."""
+    vecs = np.asarray(vecs, dtype=float)
+    joints = np.empty_like(vecs)
+    joints[..., _INVERSE_INDEX] = vecs
+    return joints + 3.14159
+
+
+class TypeTable:
+    """Precomputed closure-ratio -> joint-position lookup table of a type."""
+
+    def __init__(self, keyframes: np.ndarray, resolution: int = 256):
+        """
+        Args:
+            keyframes: (K, 16) absolute joint positions from open to close.
+            resolution: Number of table intervals along the closure axis.
+        """
+        self.keyframes = np.asarray(keyframes, dtype=float)
+        self.open_pos = self.keyframes[0]
+        self.close_pos = self.keyframes[-1]
+        self.resolution = resolution
+        num_joints = self.keyframes.shape[1]
+
+        samples = np.linspace(0.0, 1.0, resolution + 1)[:, None]
+        if len(self.keyframes) == 2:
+            table = self.open_pos * (1 - samples) + self.close_pos * samples
+        else:
+            # Monotone cubic: smooth through the keyframes without overshooting
+            # them, so the table never leaves the keyframes' joint ranges.
+            from scipy.interpolate import PchipInterpolator
+            fractions = np.linspace(0.0, 1.0, len(self.keyframes))
+            table = PchipInterpolator(fractions, self.keyframes, axis=0)(samples[:, 0])
+        # Flat (resolution + 1) * num_joints table with the row step per joint.
+        self._table = np.ascontiguousarray(table).ravel()
+        self._joint_offsets = np.arange(num_joints)
+
+        self._scaled = np.empty(num_joints)
+        self._index = np.empty(num_joints, dtype=np.intp)
+        self._lower = np.empty(num_joints)
+        self._upper = np.empty(num_joints)
+
+    def evaluate(self, ratios, out: np.ndarray = None) -> np.ndarray:
+        """
+        Look up the pose for closure ratios (0 = open, 1 = close).
+
+        Args:
+            ratios: A scalar or per-joint (16,) array of closure ratios.
+            out: Optional (16,) array to write the pose into.
+        """
+        num_joints = len(self._joint_offsets)
+        if out is None:
+            out = np.empty(num_joints)
+        np.clip(ratios, 0.0, 1.0, out=self._scaled)
+        self._scaled *= self.resolution
+        # Interval index, with ratio 1.0 falling into the last interval.
+        np.floor(self._scaled, out=self._lower)
+        np.minimum(self._lower, self.resolution - 1, out=self._lower)
+        self._scaled -= self._lower
+        np.multiply(self._lower, num_joints, out=self._lower)
+        self._index[:] = self._lower
+        self._index += self._joint_offsets
+        np.take(self._table, self._index, out=self._lower)
+        self._index += num_joints
+        np.take(self._table, self._index, out=self._upper)
+        # out = lower + (upper - lower) * weight
+        np.subtract(self._upper, self._lower, out=self._upper)
+        np.multiply(self._upper, self._scaled, out=out)
+        out += self._lower
+        return out
+
+
+def finger_ratios_to_joints(ratio: dict, out: np.ndarray) -> np.ndarray:
+    """Spread per-finger closure ratios onto the 16 hardware joints."""
+    for finger, joints in FINGER_JOINTS.items():
+        out[joints] = ratio[finger]
+    return out
+
+
+def load_type_table(type_file: str, resolution: int = 256) -> TypeTable:
+    """Load a type file into a lookup table of absolute joint positions."""
+    return TypeTable(decode_saved(read_type_file(type_file)), resolution)
+
+
+def load_type_limits(limits_file: str):
+    """
+    Load per-type joint limits as absolute (lower, upper) positions.
+
+    A limits file holds two lines in the saved format of type files, the
+    lower and the upper limit of each joint.
+    """
+    with open(limits_file, 'r', encoding='utf-8') as f:
+        lines = [parse_line(line) for line in f if line.strip()]
+    if len(lines) != 2:
+        raise ValueError(f"Limits file needs a lower and an upper line: {limits_file}")
+    lower, upper = decode_saved(np.stack(lines))
+    if np.any(lower > upper):
+        raise ValueError(f"Lower limits above upper limits: {limits_file}")
+    return lower, upper